@@ -0,0 +1,3 @@
+"""
+Benchmarks for r2dto_rdf.  Run them with ``python -m benchmarks``; see ``python -m benchmarks --help``.
+"""
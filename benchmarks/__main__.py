@@ -0,0 +1,42 @@
+from __future__ import print_function, unicode_literals
+
+import argparse
+import sys
+
+from benchmarks import runner
+from benchmarks.workloads import WORKLOADS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks for r2dto_rdf.")
+    parser.add_argument("workloads", nargs="*", help="The workloads to run (all of them by default): {}".format(
+        ", ".join(workload.name for workload in WORKLOADS)))
+    parser.add_argument("--size", type=int, default=1000, help="The number of objects per workload.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of timed runs; the fastest one counts.")
+    parser.add_argument("--save", metavar="FILE", help="Save the results as a baseline.")
+    parser.add_argument("--compare", metavar="FILE", help="Fail if the results are worse than this baseline.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="How much worse than the baseline is a regression, as a fraction (default 0.2).")
+    args = parser.parse_args(argv)
+
+    workloads = [workload for workload in WORKLOADS if not args.workloads or workload.name in args.workloads]
+    unknown = set(args.workloads) - {workload.name for workload in WORKLOADS}
+    if unknown:
+        parser.error("Unknown workloads: {}".format(", ".join(sorted(unknown))))
+
+    results = runner.run(workloads, args.size, args.repeat)
+    print(runner.format_results(results))
+    if args.save:
+        runner.save(results, args.save)
+    if args.compare:
+        regressions = runner.compare(results, runner.load(args.compare), args.threshold)
+        if regressions:
+            print("\nRegressions against {}:".format(args.compare))
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+
+import gc
+import json
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+
+def measure(workload, size, repeat):
+    """
+    Runs ``workload`` ``repeat`` times on ``size`` objects and keeps the fastest run.  Peak memory is measured in
+    a separate run with tracemalloc, since tracing slows everything down; it is None where tracemalloc isn't
+    available.  Returns a dict of the results.
+    """
+    objects = workload.setup(size)
+    best = None
+    triples = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = clock()
+        triples = workload.run(objects)
+        elapsed = clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak_memory = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            workload.run(objects)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "objects": len(objects),
+        "triples": triples,
+        "seconds": best,
+        "objects_per_second": len(objects) / best if best else 0.0,
+        "triples_per_second": triples / best if best else 0.0,
+        "peak_memory": peak_memory,
+    }
+
+
+def run(workloads, size=1000, repeat=5):
+    return {workload.name: measure(workload, size, repeat) for workload in workloads}
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compares ``results`` to a saved ``baseline``.  Returns a message for each workload that is more than
+    ``threshold`` (a fraction) slower than the baseline, or that needs that much more memory.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["objects_per_second"] < base["objects_per_second"] * (1 - threshold):
+            regressions.append("{}: {:.0f} objects/s, baseline {:.0f} objects/s".format(
+                name, result["objects_per_second"], base["objects_per_second"]))
+        if result["peak_memory"] is not None and base.get("peak_memory") is not None and \
+                result["peak_memory"] > base["peak_memory"] * (1 + threshold):
+            regressions.append("{}: peak memory {} bytes, baseline {} bytes".format(
+                name, result["peak_memory"], base["peak_memory"]))
+    return regressions
+
+
+def save(results, filename):
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def format_results(results):
+    lines = ["{:<18} {:>8} {:>10} {:>14} {:>14} {:>12}".format(
+        "workload", "objects", "triples", "objects/s", "triples/s", "peak KiB")]
+    for name, result in sorted(results.items()):
+        peak = "-" if result["peak_memory"] is None else "{:.0f}".format(result["peak_memory"] / 1024.0)
+        lines.append("{:<18} {:>8} {:>10} {:>14.0f} {:>14.0f} {:>12}".format(
+            name, result["objects"], result["triples"], result["objects_per_second"], result["triples_per_second"],
+            peak))
+    return "\n".join(lines)
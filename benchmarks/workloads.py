@@ -0,0 +1,179 @@
+from __future__ import unicode_literals
+
+import datetime
+
+import r2dto
+
+from r2dto_rdf import RdfSerializer, RdfIriField, RdfStringField, RdfIntegerField, RdfFloatField, RdfBooleanField, \
+    RdfDateTimeField, RdfObjectField, RdfSetField, ValidationError, create_rdf_serializer_from_r2dto_serializer
+
+PREFIXES = {"bm": "http://api.nickswebsite.net/bench/"}
+
+
+class Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FlatSerializer(RdfSerializer):
+    name = RdfStringField(predicate="bm:name", required=True)
+    description = RdfStringField(predicate="bm:description", language="en")
+    count = RdfIntegerField(predicate="bm:count")
+    score = RdfFloatField(predicate="bm:score")
+    active = RdfBooleanField(predicate="bm:active")
+    created = RdfDateTimeField(predicate="bm:created")
+    homepage = RdfIriField(predicate="bm:homepage")
+
+    class Meta:
+        rdf_subject = "id"
+        rdf_type = "bm:Flat"
+        rdf_prefixes = PREFIXES
+
+
+class LeafSerializer(RdfSerializer):
+    name = RdfStringField(predicate="bm:name")
+    count = RdfIntegerField(predicate="bm:count")
+
+    class Meta:
+        rdf_prefixes = PREFIXES
+
+
+def make_nested_serializer(depth):
+    serializer_class = LeafSerializer
+    for _ in range(depth):
+        class NestedSerializer(RdfSerializer):
+            name = RdfStringField(predicate="bm:name")
+            child = RdfObjectField(serializer_class, predicate="bm:child")
+
+            class Meta:
+                rdf_prefixes = PREFIXES
+        serializer_class = NestedSerializer
+    return serializer_class
+
+
+class WideSerializer(RdfSerializer):
+    tags = RdfSetField(RdfStringField(), predicate="bm:tag")
+    scores = RdfSetField(RdfIntegerField(None), predicate="bm:score")
+    items = RdfSetField(RdfObjectField(LeafSerializer), predicate="bm:item")
+
+    class Meta:
+        rdf_subject = "id"
+        rdf_type = "bm:Wide"
+        rdf_prefixes = PREFIXES
+
+
+class R2DtoLeafSerializer(r2dto.Serializer):
+    name = r2dto.fields.StringField()
+    count = r2dto.fields.IntegerField()
+
+    class Rdf:
+        name = "http://api.nickswebsite.net/bench/name"
+        count = "http://api.nickswebsite.net/bench/count"
+
+
+class R2DtoSerializer(r2dto.Serializer):
+    id = r2dto.fields.StringField(required=True, allow_null=False)
+    name = r2dto.fields.StringField()
+    count = r2dto.fields.IntegerField()
+    created = r2dto.fields.DateTimeField()
+    tags = r2dto.fields.ListField(r2dto.fields.StringField())
+    leaf = r2dto.fields.ObjectField(R2DtoLeafSerializer)
+
+    class Meta:
+        rdf_subject = "id"
+
+    class Rdf:
+        name = "http://api.nickswebsite.net/bench/name"
+        count = "http://api.nickswebsite.net/bench/count"
+        created = "http://api.nickswebsite.net/bench/created"
+        tags = "http://api.nickswebsite.net/bench/tag"
+        leaf = "http://api.nickswebsite.net/bench/leaf"
+
+
+def flat_object(i):
+    return Model(id="http://api.nickswebsite.net/data#{}".format(i), name="Name {}".format(i),
+                 description="Object number {}".format(i), count=i, score=i / 7.0, active=bool(i % 2),
+                 created=datetime.datetime(2016, 1, 1, 12, 0, i % 60),
+                 homepage="http://api.nickswebsite.net/{}".format(i))
+
+
+def nested_object(i, depth):
+    obj = Model(name="Leaf {}".format(i), count=i)
+    for level in range(depth):
+        obj = Model(name="Level {} of {}".format(level, i), child=obj)
+    return obj
+
+
+def wide_object(i, width):
+    return Model(id="http://api.nickswebsite.net/data#{}".format(i),
+                 tags=["tag {}".format(j) for j in range(width)],
+                 scores=list(range(width)),
+                 items=[Model(name="Item {}".format(j), count=j) for j in range(width // 10)])
+
+
+def r2dto_object(i):
+    return Model(id="http://api.nickswebsite.net/data#{}".format(i), name="Name {}".format(i), count=i,
+                 created=datetime.datetime(2016, 1, 1, 12, 0, i % 60), tags=["a", "b", "c"],
+                 leaf=Model(name="Leaf {}".format(i), count=i))
+
+
+def build_graphs(serializer_class, objects):
+    triples = 0
+    for obj in objects:
+        triples += len(serializer_class(object=obj).build_graph())
+    return triples
+
+
+def validate_all(serializer_class, objects):
+    for obj in objects:
+        try:
+            serializer_class(object=obj).validate()
+        except ValidationError:
+            pass
+    return 0
+
+
+class Workload(object):
+    """
+    One benchmark.  ``setup(size)`` returns the objects to run on, and ``run(objects)`` does the work and returns
+    the number of triples it produced.
+    """
+    def __init__(self, name, description, setup, run):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.run = run
+
+
+def _invalid_object(i):
+    obj = flat_object(i)
+    obj.name = None
+    obj.count = "not a number"
+    return obj
+
+
+NESTING_DEPTH = 8
+SET_WIDTH = 100
+NestedSerializer = make_nested_serializer(NESTING_DEPTH)
+MappedSerializer = create_rdf_serializer_from_r2dto_serializer(R2DtoSerializer)
+
+WORKLOADS = [
+    Workload("flat", "build_graph on objects with seven literal and IRI fields",
+             lambda size: [flat_object(i) for i in range(size)],
+             lambda objects: build_graphs(FlatSerializer, objects)),
+    Workload("nested", "build_graph on RdfObjectFields nested {} deep".format(NESTING_DEPTH),
+             lambda size: [nested_object(i, NESTING_DEPTH) for i in range(size)],
+             lambda objects: build_graphs(NestedSerializer, objects)),
+    Workload("sets", "build_graph on RdfSetFields of {} items".format(SET_WIDTH),
+             lambda size: [wide_object(i, SET_WIDTH) for i in range(max(size // 10, 1))],
+             lambda objects: build_graphs(WideSerializer, objects)),
+    Workload("validate-valid", "validate() on valid flat objects",
+             lambda size: [flat_object(i) for i in range(size)],
+             lambda objects: validate_all(FlatSerializer, objects)),
+    Workload("validate-invalid", "validate() on invalid flat objects",
+             lambda size: [_invalid_object(i) for i in range(size)],
+             lambda objects: validate_all(FlatSerializer, objects)),
+    Workload("r2dto", "build_graph on a serializer mapped from r2dto",
+             lambda size: [r2dto_object(i) for i in range(size)],
+             lambda objects: build_graphs(MappedSerializer, objects)),
+]
@@ -6,3 +6,4 @@ from r2dto_rdf.fields import RdfField, RdfIriField, RdfSetField, RdfObjectField,
     RdfDateTimeField, RdfUuidField
 from r2dto_rdf.mapping import create_rdf_serializer_from_r2dto_serializer, RdfR2DtoSerializer
 from r2dto_rdf.serializer import RdflibNamespaceManager, RdfSerializer
+from r2dto_rdf.terms import TermCache
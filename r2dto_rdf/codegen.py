@@ -0,0 +1,163 @@
+from __future__ import unicode_literals
+
+import linecache
+
+from r2dto_rdf import rdf
+from r2dto_rdf.context import SerializationContext
+from r2dto_rdf.errors import ValidationError
+from r2dto_rdf.fields import FIELD_KIND_LITERAL, FIELD_KIND_IRI, MISSING, RdfField, iter_field_triples
+
+
+class SourceBuilder(object):
+    """
+    Collects the lines of a generated function and the constants it uses.  The constants are passed in as default
+    arguments, so they are locals of the generated function.
+    """
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.lines = []
+        self.constants = []
+
+    def constant(self, name, value):
+        self.constants.append((name, value))
+        return name
+
+    def line(self, depth, text):
+        self.lines.append("    " * depth + text)
+
+    def source(self):
+        defaults = ", ".join("{0}={0}".format(constant) for constant, _ in self.constants)
+        signature = "def {}({}, {}):".format(self.name, self.args, defaults)
+        return "\n".join([signature] + self.lines) + "\n"
+
+
+def generate_iter_plan_triples(serializer_class, generic):
+    src = SourceBuilder("_iter_plan_triples", "cls, obj, subject_node, context")
+    src.constant("_owner", serializer_class)
+    src.constant("_generic", generic)
+    src.constant("_Literal", rdf.Literal)
+    src.constant("_URIRef", rdf.URIRef)
+    src.constant("_iter_field_triples", iter_field_triples)
+
+    # Validating, profiled and term cached runs are rare enough to go through the generic version.
+    src.line(1, "if cls is not _owner or context.errors is not None or context.terms is not None "
+                "or context.profiler is not None:")
+    src.line(2, "for triple in _generic(cls, obj, subject_node, context):")
+    src.line(3, "yield triple")
+    src.line(2, "return")
+
+    plan = serializer_class.plan
+    for i, field_plan in enumerate(plan.fields):
+        src.line(1, "value = getattr(obj, {!r}, None)".format(str(field_plan.name)))
+        src.line(1, "if value is not None:")
+        predicate = src.constant("_predicate_{}".format(i), field_plan.predicate)
+        rendered = "value"
+        if field_plan.kind in (FIELD_KIND_LITERAL, FIELD_KIND_IRI):
+            render = field_plan.field.render
+            if getattr(render, "__func__", render) is not RdfField.__dict__["render"]:
+                rendered = "{}(value)".format(src.constant("_render_{}".format(i), render))
+
+        if field_plan.kind == FIELD_KIND_LITERAL:
+            args = [rendered]
+            if field_plan.language or field_plan.datatype is not None:
+                args.append(src.constant("_language_{}".format(i), field_plan.language))
+            if field_plan.datatype is not None:
+                args.append(src.constant("_datatype_{}".format(i), field_plan.datatype))
+            src.line(2, "yield subject_node, {}, _Literal({})".format(predicate, ", ".join(args)))
+        elif field_plan.kind == FIELD_KIND_IRI:
+            src.line(2, "yield subject_node, {}, _URIRef({})".format(predicate, rendered))
+        else:
+            field = src.constant("_field_plan_{}".format(i), field_plan)
+            src.line(2, "for triple in _iter_field_triples({}, value, subject_node, context):".format(field))
+            src.line(3, "yield triple")
+
+    if plan.rdf_type is not None:
+        rdf_type = src.constant("_rdf_type", rdf.RDF.type)
+        src.line(1, "yield subject_node, {}, {}".format(rdf_type, src.constant("_type", plan.rdf_type)))
+
+    return src
+
+
+def generate_check_object(serializer_class, generic):
+    src = SourceBuilder("_check_object", "cls, obj, failed=None")
+    src.constant("_owner", serializer_class)
+    src.constant("_generic", generic)
+    src.constant("_MISSING", MISSING)
+    src.constant("_ValidationError", ValidationError)
+    src.constant("_SerializationContext", SerializationContext)
+
+    # Runs that need the names of the failed fields are rare enough to go through the generic version.
+    src.line(1, "if cls is not _owner or failed is not None or _SerializationContext.profiler is not None:")
+    src.line(2, "return _generic(cls, obj, failed)")
+    src.line(1, "errors = []")
+    for i, validation_plan in enumerate(serializer_class.plan.validation):
+        name = str(validation_plan.name)
+        checks = []
+        if validation_plan.basetypes is not None:
+            basetypes = src.constant("_basetypes_{}".format(i), validation_plan.basetypes)
+            field = src.constant("_field_{}".format(i), validation_plan.field)
+            checks.append((0, "if not isinstance(value, {}):".format(basetypes)))
+            checks.append((1, "errors.extend({}.type_error(value, {}).errors)".format(field, basetypes)))
+        elif validation_plan.validate is not None:
+            checks.extend(_try_call(src.constant("_validate_{}".format(i), validation_plan.validate)))
+        for j, validator in enumerate(validation_plan.validators):
+            checks.extend(_try_call(src.constant("_validator_{}_{}".format(i, j), validator)))
+        if not checks and not validation_plan.required:
+            continue
+
+        src.line(1, "value = getattr(obj, {!r}, _MISSING)".format(name))
+        if validation_plan.required:
+            src.line(1, "if value is _MISSING:")
+            src.line(2, "errors.append({!r})".format(str("Field {} is missing from object.".format(name))))
+            src.line(1, "elif value is None:")
+            src.line(2, "errors.append({!r})".format(str("Field {} cannot be None.".format(name))))
+            if checks:
+                src.line(1, "else:")
+        else:
+            src.line(1, "if value is not _MISSING and value is not None:")
+        for depth, line in checks:
+            src.line(2 + depth, line)
+    src.line(1, "return errors")
+
+    return src
+
+
+def _try_call(function):
+    return [
+        (0, "try:"),
+        (1, "{}(value)".format(function)),
+        (0, "except _ValidationError as ex:"),
+        (1, "errors.extend(ex.errors)"),
+    ]
+
+
+def compile_function(serializer_class, src):
+    """
+    Compiles a generated function.  Its source is registered with linecache so that tracebacks and ``inspect`` can
+    show it.
+    """
+    source = src.source()
+    filename = "<r2dto_rdf generated {}.{}.{}>".format(serializer_class.__module__, serializer_class.__name__, src.name)
+    namespace = dict(src.constants)
+    exec(compile(source, filename, "exec"), namespace)
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    return namespace[src.name], source
+
+
+def install_generated_methods(serializer_class):
+    """
+    Replaces the plan interpreting ``_iter_plan_triples`` and ``_check_object`` of ``serializer_class`` with
+    straight-line versions generated from its plan (``Meta.rdf_codegen``).  The generated source is kept in
+    ``serializer_class.generated_source``.
+    """
+    from r2dto_rdf.serializer import BaseRdfSerializer
+
+    sources = []
+    for generate, name in ((generate_iter_plan_triples, "_iter_plan_triples"),
+                           (generate_check_object, "_check_object")):
+        src = generate(serializer_class, BaseRdfSerializer.__dict__[name].__func__)
+        function, source = compile_function(serializer_class, src)
+        setattr(serializer_class, name, classmethod(function))
+        sources.append(source)
+    serializer_class.generated_source = "\n".join(sources)
@@ -0,0 +1,74 @@
+from __future__ import unicode_literals
+
+import itertools
+import uuid
+
+from r2dto_rdf import rdf
+
+DETERMINISTIC_BLANK_NODE_PREFIX = "b_"
+
+
+def random_blank_node_prefix():
+    return "b{}_".format(uuid.uuid4().hex[:16])
+
+
+class BlankNodeAllocator(object):
+    """
+    Hands out the blank nodes of a serialization run.  The labels are ``prefix`` followed by a counter, so only the
+    prefix has to be random (once per run, not once per node).  A fixed prefix makes the labels, and therefore the
+    output, the same every time the same objects are serialized.
+    """
+    def __init__(self, prefix=None):
+        self.prefix = prefix if prefix is not None else random_blank_node_prefix()
+        self._counter = itertools.count()
+
+    def __call__(self):
+        return rdf.BNode("{}{}".format(self.prefix, next(self._counter)))
+
+
+class SerializationContext(object):
+    """
+    The state shared by everything rendered in one serialization run, from the top level object down to the last
+    nested value.
+
+    If ``validate`` is True, values are validated as they are rendered and the problems are collected in ``errors``
+    instead of being raised; otherwise ``errors`` is None.  ``failures`` is None unless the names of the fields that
+    failed are wanted (for the metrics); then it maps each serializer class to the list of them.
+
+    ``new_blank_node`` is called for every blank node of the run.  It is ``blank_nodes`` if one is given (any callable
+    returning a BNode), otherwise a BlankNodeAllocator with a random prefix, or a fixed one if ``deterministic`` is
+    True.
+
+    ``skolemized`` holds the content named nodes of ``Meta.rdf_skolemize`` serializers that have been written so
+    far, so each one is only written once per run.
+
+    ``visited`` maps the id of every object rendered so far to the object and its node, so an object that is
+    referred to again, including through a cycle, is linked to instead of being rendered again.  Collapsed objects
+    are keyed by (id, subject) instead, since they are rendered onto each subject they're collapsed into.  The bulk
+    methods clear it between top level objects, which keeps their memory use flat and each object's triples
+    self-contained.
+
+    If ``terms`` (a TermCache) is given, the IRIs and literals of the run are created through it.
+
+    ``profiler`` is the Profiler recording the run, if any.  It is a class attribute so that
+    ``r2dto_rdf.profiling.profile`` can turn profiling on for every run at once.
+    """
+    profiler = None
+
+    def __init__(self, validate=False, blank_nodes=None, deterministic=False, terms=None):
+        self.errors = [] if validate else None
+        self.failures = None
+        if blank_nodes is None:
+            blank_nodes = BlankNodeAllocator(DETERMINISTIC_BLANK_NODE_PREFIX if deterministic else None)
+        self.new_blank_node = blank_nodes
+        self.skolemized = set()
+        self.visited = {}
+        self.terms = terms
+
+    def failed_fields(self, serializer_class):
+        """
+        Returns the list to add the names of the failed fields of ``serializer_class`` to, or None.
+        """
+        if self.failures is None:
+            return None
+        return self.failures.setdefault(serializer_class, [])
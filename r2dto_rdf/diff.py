@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+from r2dto_rdf import rdf
+from r2dto_rdf.context import SerializationContext
+from r2dto_rdf.fields import FIELD_KIND_LITERAL, FIELD_KIND_IRI, iter_plan_triples, name_blank_nodes
+
+
+class GraphDiff(namedtuple("GraphDiff", ("added", "removed"))):
+    """
+    The triples to add and the triples to remove, as sets, to get from one version of an object to another.
+    """
+    __slots__ = ()
+
+
+def _render(plan, obj, subject_node, skolemize):
+    """
+    Returns the triples of ``obj`` and the nodes they share with other objects.
+    """
+    # The nested blank nodes are named after their content, the subject and the path to them, so the same values of
+    # the same object always get the same nodes, and no two objects share one.
+    context = SerializationContext(deterministic=True)
+    context.visited[id(obj)] = (obj, subject_node)
+    triples = list(iter_plan_triples(plan, obj, subject_node, context))
+    if not triples:
+        return set(), set()
+    names = name_blank_nodes(triples, subject_node, skolemize, scoped=True)
+    names[subject_node] = subject_node
+    triples = {(names.get(s, s), p, names.get(o, o)) for s, p, o in triples}
+    # Nested serializers with an IRI base for Meta.rdf_skolemize name their nodes after the content alone, so every
+    # object with an equal value links to the same node.
+    return triples, _reachable(triples, {node for node in context.skolemized if not isinstance(node, rdf.BNode)})
+
+
+def _reachable(triples, nodes):
+    about = {}
+    for s, _, o in triples:
+        about.setdefault(s, []).append(o)
+    found = set()
+    frontier = [node for node in nodes if node in about]
+    while frontier:
+        node = frontier.pop()
+        if node in found:
+            continue
+        found.add(node)
+        frontier.extend(o for o in about[node] if o in about)
+    return found
+
+
+def _graph_diff(old, new):
+    old_triples, shared = old
+    new_triples, _ = new
+    # Other objects may still use the triples of a shared node, so only the links to it are removed.
+    removed = {triple for triple in old_triples - new_triples if triple[0] not in shared}
+    return GraphDiff(new_triples - old_triples, removed)
+
+
+def _subject_node(serializer_class, obj, subject):
+    if obj is None:
+        return None
+    if subject is None and serializer_class.plan.subject_field is None:
+        raise ValueError("A subject MUST be provided to diff objects of {}, since it has no rdf_subject.".format(
+            serializer_class.__name__))
+    return serializer_class.get_object_subject_node(obj, subject)
+
+
+def _may_differ(field_plan, old, new):
+    if field_plan.kind not in (FIELD_KIND_LITERAL, FIELD_KIND_IRI):
+        return True
+    return getattr(old, field_plan.name, None) != getattr(new, field_plan.name, None)
+
+
+def diff_objects(serializer_class, old, new, subject=None, skolemize=True):
+    """
+    Returns the GraphDiff between the triples of ``old`` and ``new`` (either can be None).  See
+    ``BaseRdfSerializer.diff``.
+    """
+    plan = serializer_class.plan
+    old_node = _subject_node(serializer_class, old, subject)
+    new_node = _subject_node(serializer_class, new, subject)
+    if old_node != new_node:
+        # Everything hangs off of the subject, so nothing carries over.
+        nothing = set(), set()
+        return _graph_diff(_render(plan, old, old_node, skolemize) if old is not None else nothing,
+                           _render(plan, new, new_node, skolemize) if new is not None else nothing)
+
+    # Plain values that are equal render the same, so only the other fields have to be rendered.  They're rendered
+    # together since nested objects can be shared between fields.
+    changed = tuple(field_plan for field_plan in plan.fields if _may_differ(field_plan, old, new))
+    if not changed:
+        return GraphDiff(set(), set())
+    changed_plan = plan._replace(fields=changed, rdf_type=None)
+    return _graph_diff(_render(changed_plan, old, old_node, skolemize), _render(changed_plan, new, new_node, skolemize))
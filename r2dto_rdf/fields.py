@@ -1,25 +1,323 @@
 from __future__ import unicode_literals
 
+from collections import namedtuple
 import datetime
+import hashlib
+import re
+import threading
 try:
     import urlparse
 except ImportError:
     from urllib import parse as urlparse
 import uuid
 
-import r2dto
-from rdflib import Graph, BNode, Literal
-
+from r2dto_rdf import rdf
+from r2dto_rdf.context import SerializationContext
 from r2dto_rdf.errors import ValidationError
 
+try:
+    string_types = (basestring,)
+    integer_types = (int, long)
+except NameError:
+    string_types = (str,)
+    integer_types = (int,)
+
+
+FIELD_KIND_LITERAL = "literal"
+FIELD_KIND_IRI = "iri"
+FIELD_KIND_NESTED = "nested"
+FIELD_KIND_SET = "set"
+
 
 def is_iri(iri):
     p = urlparse.urlparse(iri)
     return bool(p.scheme) and bool(p.netloc)
 
 
+class FieldPlan(namedtuple("FieldPlan", ("field", "name", "kind", "predicate", "datatype", "language", "collapse",
+                                         "item", "validation", "skolemize"))):
+    """
+    The resolved form of a field for one serializer class.  ``predicate`` and ``datatype`` are already rdflib terms
+    (or None), and ``kind`` is one of the ``FIELD_KIND_*`` constants.  ``item`` is the plan of the allowed type of a
+    set field; it carries the predicate of the set.
+
+    ``validation`` is the ValidationPlan used when validating while rendering.  For nested objects and sets it has no
+    ``validate`` step, since their contents are validated as they are rendered.  ``skolemize`` is the
+    ``Meta.rdf_skolemize`` of a nested serializer.
+    """
+    __slots__ = ()
+
+
+class ValidationPlan(namedtuple("ValidationPlan",
+                                ("field", "name", "required", "basetypes", "validate", "validators"))):
+    """
+    The resolved validation steps of a field: either ``basetypes`` to check with isinstance or a ``validate``
+    callable (or neither), followed by the normalized tuple of ``validators``.
+    """
+    __slots__ = ()
+
+
+MISSING = object()
+
+# The ids of the nested objects each thread is validating right now, so cycles are only validated once.
+_validating = threading.local()
+
+
+def check_value(validation_plan, data, errors):
+    """
+    Validates ``data``, the value of the field described by ``validation_plan``, and appends any problems to
+    ``errors``.  ``data`` is MISSING if the object doesn't have the attribute at all.  Returns True if there is a
+    valid value to render.
+    """
+    if data is MISSING or data is None:
+        if validation_plan.required:
+            if data is MISSING:
+                errors.append("Field {} is missing from object.".format(validation_plan.name))
+            else:
+                errors.append("Field {} cannot be None.".format(validation_plan.name))
+        return False
+
+    error_count = len(errors)
+    if validation_plan.basetypes is not None:
+        if not isinstance(data, validation_plan.basetypes):
+            errors.extend(validation_plan.field.type_error(data, validation_plan.basetypes).errors)
+    elif validation_plan.validate is not None:
+        try:
+            validation_plan.validate(data)
+        except ValidationError as ex:
+            errors.extend(ex.errors)
+
+    for validator in validation_plan.validators:
+        try:
+            validator(data)
+        except ValidationError as ex:
+            errors.extend(ex.errors)
+
+    return len(errors) == error_count
+
+
+def iter_plan_triples(plan, obj, subject_node, context, failed=None):
+    """
+    Yields the triples of the fields of ``plan`` (a SerializerPlan) for ``obj``, followed by its ``rdf:type``.  When
+    validating, the names of the fields with errors, including errors in their nested objects, are added to
+    ``failed`` if it is given.
+    """
+    errors = context.errors
+    terms = context.terms
+    for field_plan in plan.fields:
+        if errors is None:
+            raw_data = getattr(obj, field_plan.name, None)
+            if raw_data is None:
+                continue
+        else:
+            error_count = len(errors)
+            raw_data = getattr(obj, field_plan.name, MISSING)
+            if not check_value(field_plan.validation, raw_data, errors):
+                if failed is not None and len(errors) != error_count:
+                    failed.append(field_plan.name)
+                continue
+
+        kind = field_plan.kind
+        if kind == FIELD_KIND_LITERAL:
+            data = field_plan.field.render(raw_data)
+            if terms is None:
+                data = rdf.Literal(data, field_plan.language, field_plan.datatype)
+            else:
+                data = terms.literal(data, field_plan.language, field_plan.datatype)
+            yield subject_node, field_plan.predicate, data
+        elif kind == FIELD_KIND_IRI:
+            data = field_plan.field.render(raw_data)
+            yield subject_node, field_plan.predicate, rdf.URIRef(data) if terms is None else terms.iri(data)
+        else:
+            for triple in iter_field_triples(field_plan, raw_data, subject_node, context):
+                yield triple
+            if failed is not None and len(errors) != error_count:
+                failed.append(field_plan.name)
+
+    if plan.rdf_type is not None:
+        yield subject_node, rdf.RDF.type, plan.rdf_type
+
+
+def iter_field_triples(field_plan, obj, subject, context=None):
+    """
+    Yields the (s, p, o) triples for ``obj``, the value of the field described by ``field_plan``, depth first.
+    """
+    if context is None:
+        context = SerializationContext()
+    kind = field_plan.kind
+    field = field_plan.field
+    terms = context.terms
+    if kind == FIELD_KIND_LITERAL:
+        if terms is None:
+            data = rdf.Literal(field.render(obj), field_plan.language, field_plan.datatype)
+        else:
+            data = terms.literal(field.render(obj), field_plan.language, field_plan.datatype)
+        yield subject, field_plan.predicate, data
+    elif kind == FIELD_KIND_IRI:
+        if terms is None:
+            yield subject, field_plan.predicate, rdf.URIRef(field.render(obj))
+        else:
+            yield subject, field_plan.predicate, terms.iri(field.render(obj))
+    elif field_plan.collapse:
+        if kind == FIELD_KIND_NESTED:
+            # Collapsed objects are tracked per subject: the same object can be collapsed into several of them.
+            key = (id(obj), subject)
+            if key in context.visited:
+                # It's already on this subject, or on its way there.
+                return
+            context.visited[key] = (obj, subject)
+        for triple in _iter_nested_triples(field_plan, obj, subject, context):
+            yield triple
+    elif id(obj) in context.visited and kind == FIELD_KIND_NESTED:
+        node = context.visited[id(obj)][1]
+        if node is not None:
+            yield subject, field_plan.predicate, node
+    elif field_plan.skolemize:
+        for triple in _iter_skolemized_triples(field_plan, obj, subject, context):
+            yield triple
+    else:
+        blank_node = context.new_blank_node()
+        if kind == FIELD_KIND_NESTED:
+            context.visited[id(obj)] = (obj, blank_node)
+        triples = _iter_nested_triples(field_plan, obj, blank_node, context)
+        # Only link the blank node if there is something hanging off of it.
+        first = next(triples, None)
+        if first is not None:
+            yield subject, field_plan.predicate, blank_node
+            yield first
+            for triple in triples:
+                yield triple
+        elif kind == FIELD_KIND_NESTED:
+            context.visited[id(obj)] = (obj, None)
+
+
+SKOLEM_LABEL = re.compile(r"^h[0-9a-f]{40}$")
+
+
+def is_skolem_node(node):
+    """
+    Returns True if ``node`` is a blank node named by ``skolem_node``.  Such a node can be shared by any number of
+    objects.
+    """
+    return isinstance(node, rdf.BNode) and SKOLEM_LABEL.match(node) is not None
+
+
+def skolem_node(skolemize, triples, subject, scope=None):
+    """
+    Returns the node named after the hash of the triples about ``subject`` in ``triples``: a blank node if
+    ``skolemize`` is True, or an IRI starting with ``skolemize`` if it is a string.  Nested nodes are expected to be
+    named after their content already, so only the triples directly about ``subject`` are hashed; see
+    ``name_blank_nodes``.  A ``scope`` string is hashed along with them.
+    """
+    lines = sorted("{} {}".format(p.n3(), "_:self" if o == subject else o.n3()) for s, p, o in triples if s == subject)
+    if scope is not None:
+        lines.insert(0, scope)
+    digest = hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+    if skolemize is True:
+        return rdf.BNode("h" + digest)
+    return rdf.URIRef(skolemize + digest)
+
+
+def name_blank_nodes(triples, subject, skolemize=True, keep=(), scoped=False):
+    """
+    Names ``subject`` and the blank nodes below it in ``triples`` after the content of the whole subgraph under
+    them, from the bottom up, and returns a dict of node to name.  Nodes in ``keep`` are already named after their
+    content and are hashed as they are.  A reference back to a node that is still being named is hashed as a fixed
+    marker.
+
+    If ``scoped`` is True each name also depends on ``subject`` and on the (shortest, then smallest) path of
+    predicates leading to the node, so equal values under different subjects or fields get different names.
+    """
+    about = {}
+    for triple in triples:
+        about.setdefault(triple[0], []).append(triple)
+
+    scopes = {}
+    if scoped:
+        scopes[subject] = subject.n3()
+        frontier = [subject]
+        while frontier:
+            found = {}
+            for node in frontier:
+                for _, p, o in about.get(node, ()):
+                    if isinstance(o, rdf.BNode) and o in about and o not in scopes:
+                        scope = "{} {}".format(scopes[node], p.n3())
+                        if o not in found or scope < found[o]:
+                            found[o] = scope
+            scopes.update(found)
+            frontier = list(found)
+
+    names = {}
+    naming = set()
+
+    def name(node):
+        if node in names:
+            return names[node]
+        if node in naming:
+            return rdf.BNode("cycle")
+        naming.add(node)
+        named = [(s, p, o if o == s or o in keep or not isinstance(o, rdf.BNode) or o not in about else name(o))
+                 for s, p, o in about[node]]
+        names[node] = skolem_node(skolemize, named, node, scopes.get(node))
+        naming.discard(node)
+        return names[node]
+
+    name(subject)
+    return names
+
+
+def _iter_skolemized_triples(field_plan, obj, subject, context):
+    # The whole nested object has to be rendered before its name is known.
+    placeholder = context.new_blank_node()
+    context.visited[id(obj)] = (obj, placeholder)
+    triples = list(_iter_nested_triples(field_plan, obj, placeholder, context))
+    if not triples:
+        context.visited[id(obj)] = (obj, None)
+        return
+
+    node = name_blank_nodes(triples, placeholder, field_plan.skolemize, context.skolemized)[placeholder]
+    context.visited[id(obj)] = (obj, node)
+    yield subject, field_plan.predicate, node
+    if node in context.skolemized:
+        return
+    context.skolemized.add(node)
+    for s, p, o in triples:
+        yield (node if s == placeholder else s), p, (node if o == placeholder else o)
+
+
+def _iter_nested_triples(field_plan, obj, subject, context):
+    if field_plan.kind == FIELD_KIND_SET:
+        item_plan = field_plan.item
+        errors = context.errors
+        for item_i, item in enumerate(obj):
+            if item is None:
+                continue
+            if errors is None:
+                for triple in iter_field_triples(item_plan, item, subject, context):
+                    yield triple
+                continue
+
+            error_count = len(errors)
+            if check_value(item_plan.validation, item, errors):
+                for triple in iter_field_triples(item_plan, item, subject, context):
+                    yield triple
+            if len(errors) != error_count:
+                errors.insert(error_count, "{}.{}[{}] error processing".format(
+                    field_plan.field.parent, field_plan.name, item_i))
+    elif hasattr(field_plan.field, "iter_triples"):
+        for triple in field_plan.field.iter_triples(obj, subject, context):
+            yield triple
+    else:
+        subobject_graph = field_plan.field.build_graph(obj, subject)
+        if subobject_graph:
+            for triple in subobject_graph:
+                yield triple
+
+
 class RdfField(object):
     datatype = None
+    # The types a value must be an instance of, or None if the field doesn't check types this way.
+    basetypes = None
 
     def __init__(self, predicate, required, datatype=None, language=None, validators=None):
         self.predicate = predicate
@@ -42,14 +340,63 @@ class RdfField(object):
         return obj
 
     def validate(self, obj):
-        pass
+        if self.basetypes is not None and not isinstance(obj, self.basetypes):
+            raise self.type_error(obj, self.basetypes)
+
+    def type_error(self, obj, expected):
+        return ValidationError("{} must be a {}.  Got {}.".format(self.object_field_name, expected, type(obj)))
+
+    def compile_validation(self):
+        """
+        Returns the ValidationPlan of this field.  Fields that only check ``basetypes`` get their check inlined into
+        the serializer's validation loop instead of a call to ``validate``.
+        """
+        validators = self.validators
+        if not validators:
+            validators = ()
+        elif hasattr(validators, "__iter__"):
+            validators = tuple(validators)
+        else:
+            validators = (validators,)
+
+        validate = self.validate
+        basetypes = None
+        if getattr(validate, "__func__", None) is RdfField.__dict__["validate"]:
+            basetypes = self.basetypes
+            validate = None
+        return ValidationPlan(self, self.object_field_name, self.required, basetypes, validate, validators)
+
+    def compile(self, namespace_manager):
+        """
+        Resolves the predicate and datatype of this field against ``namespace_manager`` and returns a FieldPlan.
+        """
+        predicate = None
+        if self.predicate and self.predicate != "@":
+            predicate = namespace_manager.resolve_term(self.predicate)
+
+        validation = self.compile_validation()
+        if hasattr(self, "build_graph"):
+            if hasattr(self, "iter_triples"):
+                validation = validation._replace(basetypes=None, validate=None)
+            return FieldPlan(self, self.object_field_name, FIELD_KIND_NESTED, predicate, None, None,
+                             getattr(self, "collapse", False), None, validation, False)
+
+        if self.datatype == "@id":
+            return FieldPlan(self, self.object_field_name, FIELD_KIND_IRI, predicate, None, None, False, None,
+                             validation, False)
+
+        datatype = None
+        if self.datatype and self.datatype[0] != "@":
+            datatype = namespace_manager.resolve_term(self.datatype)
+        return FieldPlan(self, self.object_field_name, FIELD_KIND_LITERAL, predicate, datatype, self.language,
+                         False, None, validation, False)
 
 
 class RdfIriField(RdfField):
     datatype = "@id"
+    basetypes = string_types
 
     def __init__(self, predicate=None, required=False, validators=None):
-        self.string_field = r2dto.fields.StringField(validators=validators)
         super(RdfIriField, self).__init__(predicate, required, validators=validators)
 
     def get_configuration_errors(self):
@@ -59,60 +406,49 @@ class RdfIriField(RdfField):
         return obj
 
     def validate(self, obj):
-        data = self.string_field.object_to_data(obj)
-        if not is_iri(data):
+        super(RdfIriField, self).validate(obj)
+        if not is_iri(obj):
             raise ValidationError(["{} is not an IRI".format(self.object_field_name)])
 
 
 class RdfStringField(RdfField):
+    basetypes = string_types
+
     def __init__(self, predicate=None, required=False, validators=None, datatype=None, language=None):
         super(RdfStringField, self).__init__(predicate, required, datatype=datatype,
                                              language=language, validators=validators)
-        self.string_field = r2dto.fields.StringField(validators=validators)
-
-    def validate(self, obj):
-        try:
-            self.string_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
 
 
 class RdfBooleanField(RdfField):
+    basetypes = (bool,)
+
     def __init__(self, predicate, required=False):
-        self.boolean_field = r2dto.fields.BooleanField(required=required)
         super(RdfBooleanField, self).__init__(predicate, required)
 
-    def validate(self, obj):
-        try:
-            self.boolean_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
-
 
 class RdfIntegerField(RdfField):
     def __init__(self, predicate, required=False, validators=None, datatype=None):
-        self.integer_field = r2dto.fields.IntegerField()
-        super(RdfIntegerField, self).__init__(predicate, required, datatype)
+        super(RdfIntegerField, self).__init__(predicate, required, datatype, validators=validators)
 
     def validate(self, obj):
-        if isinstance(obj, bool):
-            raise ValidationError("{} must be a {}.  Got {}.".format(self.object_field_name, "int", type(obj)))
-        try:
-            self.integer_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
+        if isinstance(obj, bool) or not isinstance(obj, integer_types):
+            raise self.type_error(obj, "int")
 
 
 class RdfFloatField(RdfField):
+    basetypes = (float,)
+
     def __init__(self, predicate, required=False, validators=None, datatype=None):
-        self.float_field = r2dto.fields.FloatField(required=required, validators=validators)
-        super(RdfFloatField, self).__init__(predicate, required, datatype)
+        super(RdfFloatField, self).__init__(predicate, required, datatype, validators=validators)
 
-    def validate(self, obj):
-        try:
-            self.float_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
+
+class SerializerReference(object):
+    """
+    Stands in for a serializer class that doesn't exist yet, e.g. for a serializer that refers to itself.
+    ``resolve`` is called the first time the class is needed and returns it.
+    """
+    def __init__(self, resolve):
+        self.resolve = resolve
 
 
 class RdfObjectField(RdfField):
@@ -123,9 +459,23 @@ class RdfObjectField(RdfField):
         self.predicate = predicate
         self.validators = validators
 
+    @property
+    def serializer_class(self):
+        serializer_class = self._serializer_class
+        if isinstance(serializer_class, SerializerReference):
+            serializer_class = self._serializer_class = serializer_class.resolve()
+        return serializer_class
+
+    @serializer_class.setter
+    def serializer_class(self, serializer_class):
+        self._serializer_class = serializer_class
+
     def get_configuration_errors(self):
         if not self.collapse and not self.predicate:
             return "If RdfObjectField needs a predicate if not in collapse mode."
+        if isinstance(self._serializer_class, SerializerReference):
+            # It can't be checked until it exists.
+            return None
         if not hasattr(self.serializer_class, "validate"):
             return "serializer_class MUST have a 'validate' attribute."
         if not hasattr(self.serializer_class, "build_graph"):
@@ -133,14 +483,52 @@ class RdfObjectField(RdfField):
 
     def validate(self, obj):
         if obj:
-            s = self.serializer_class(object=obj)
-            s.validate()
+            active = getattr(_validating, "ids", None)
+            if active is None:
+                active = _validating.ids = set()
+            if id(obj) in active:
+                return
+            active.add(id(obj))
+            try:
+                if hasattr(self.serializer_class, "validate_object"):
+                    self.serializer_class.validate_object(obj)
+                else:
+                    self.serializer_class(object=obj).validate()
+            finally:
+                active.discard(id(obj))
 
     def build_graph(self, obj, subject):
         if obj:
             s = self.serializer_class(object=obj)
             return s.build_graph(subject)
 
+    def compile(self, namespace_manager):
+        field_plan = super(RdfObjectField, self).compile(namespace_manager)
+        if isinstance(self._serializer_class, SerializerReference):
+            return field_plan
+        options = getattr(self.serializer_class, "options", None)
+        return field_plan._replace(skolemize=getattr(options, "rdf_skolemize", False))
+
+    def iter_triples(self, obj, subject, context=None):
+        if obj:
+            if hasattr(self.serializer_class, "iter_object_triples"):
+                for triple in self.serializer_class.iter_object_triples(obj, subject, context):
+                    yield triple
+                return
+
+            s = self.serializer_class(object=obj)
+            if hasattr(s, "iter_triples"):
+                for triple in s.iter_triples(subject, context):
+                    yield triple
+            else:
+                if context is not None and context.errors is not None:
+                    try:
+                        s.validate()
+                    except ValidationError as ex:
+                        context.errors.extend(ex.errors)
+                for triple in s.build_graph(subject):
+                    yield triple
+
 
 class RdfSetField(RdfField):
     def __init__(self, allowed_type, predicate=None, collapse=True, required=False, validators=None):
@@ -172,64 +560,53 @@ class RdfSetField(RdfField):
         if errors:
             raise ValidationError(errors)
 
+    def compile(self, namespace_manager):
+        predicate = None
+        if self.predicate:
+            predicate = namespace_manager.resolve_term(self.predicate)
+        item_plan = self.allowed_type.compile(namespace_manager)._replace(predicate=predicate)
+        validation = self.compile_validation()._replace(validate=None)
+        return FieldPlan(self, self.object_field_name, FIELD_KIND_SET, predicate, None, None, self.collapse,
+                         item_plan, validation, False)
+
     def build_graph(self, obj, subject):
-        if not subject:
-            subject_node = BNode(uuid.uuid4().hex)
-        else:
-            subject_node = subject
-
-        g = Graph()
-        field = self.allowed_type
-        for item in obj:
-            if hasattr(field, "build_graph"):
-                if field.collapse:
-                    subobject_graph = field.build_graph(item, subject_node)
-                else:
-                    blank_node_name = uuid.uuid4().hex
-                    blank_node = BNode(blank_node_name)
-                    subobject_graph = field.build_graph(item, blank_node)
-                    predicate = self.parent.namespace_manager.resolve_term(self.predicate)
-                    g.add((subject_node, predicate, blank_node))
-                g += subobject_graph
-            else:
-                predicate = self.parent.namespace_manager.resolve_term(self.predicate)
-                data_type = None
-                if field.datatype:
-                    data_type = self.parent.namespace_manager.resolve_term(field.datatype)
+        g = rdf.Graph()
+        g.addN((s, p, o, g) for s, p, o in self.iter_triples(obj, subject))
+        return g
 
-                raw_data = field.render(item)
-                data = Literal(raw_data, field.language, data_type)
-                g.add((subject_node, predicate, data))
+    def iter_triples(self, obj, subject, context=None):
+        if context is None:
+            context = SerializationContext()
+        if not subject:
+            subject = context.new_blank_node()
+        return _iter_nested_triples(self.get_field_plan(), obj, subject, context)
 
-        return g
+    def get_field_plan(self):
+        """
+        Returns this field's plan out of the parent serializer's compiled plan, so it isn't compiled on every call.
+        """
+        plan = getattr(self.parent, "plan", None)
+        if plan is not None:
+            for field_plan in plan.fields:
+                if field_plan.field is self:
+                    return field_plan
+        return self.compile(self.parent.namespace_manager)
 
 
 class RdfDateTimeField(RdfField):
     datatype = "http://www.w3.org/2001/XMLSchema#dateTime"
+    basetypes = (datetime.datetime,)
 
     def __init__(self, predicate, required=False, validators=None):
         super(RdfDateTimeField, self).__init__(predicate, required, validators=validators)
-        self.datetime_field = r2dto.fields.DateTimeField(validators=validators)
-
-    def validate(self, obj):
-        try:
-            self.datetime_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
 
 
 class RdfDateField(RdfField):
     datatype = "http://www.w3.org/2001/XMLSchema#date"
+    basetypes = (datetime.date,)
 
     def __init__(self, predicate, required=False, validators=None):
         super(RdfDateField, self).__init__(predicate, required, validators=validators)
-        self.date_field = r2dto.fields.DateField(validators=validators)
-
-    def validate(self, obj):
-        try:
-            self.date_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
 
     def render(self, obj):
         return datetime.date(*obj.timetuple()[:3])
@@ -237,16 +614,10 @@ class RdfDateField(RdfField):
 
 class RdfTimeField(RdfField):
     datatype = "http://www.w3.org/2001/XMLSchema#time"
+    basetypes = (datetime.time,)
 
     def __init__(self, predicate, required=False, validators=None):
         super(RdfTimeField, self).__init__(predicate, required, validators=validators)
-        self.time_field = r2dto.fields.TimeField()
-
-    def validate(self, obj):
-        try:
-            self.time_field.object_to_data(obj)
-        except r2dto.InvalidTypeValidationError as ex:
-            raise ValidationError(ex.errors)
 
 
 class RdfUuidField(RdfField):
@@ -268,3 +639,8 @@ class RdfUuidField(RdfField):
             return "urn:uuid:{}".format(str(obj))
         else:
             return str(obj)
+
+    def clean(self, data):
+        if self.iri and data.startswith("urn:uuid:"):
+            data = data[len("urn:uuid:"):]
+        return uuid.UUID(data)
@@ -0,0 +1,214 @@
+from __future__ import unicode_literals
+
+from r2dto_rdf import rdf
+from r2dto_rdf.fields import FIELD_KIND_LITERAL, FIELD_KIND_IRI, FIELD_KIND_SET
+
+try:
+    string_types = (basestring,)
+    text_type = unicode
+    number_types = (int, long, float)
+except NameError:
+    string_types = (str,)
+    text_type = str
+    number_types = (int, float)
+
+
+def get_jsonld_plan(serializer_class):
+    """
+    Returns the JsonLdPlan of ``serializer_class``, building it the first time it is asked for.
+    """
+    plan = serializer_class.__dict__.get("_jsonld_plan")
+    if plan is None:
+        plan = JsonLdPlan(serializer_class)
+        serializer_class._jsonld_plan = plan
+    return plan
+
+
+def term_definition(field_plan):
+    definition = {"@id": text_type(field_plan.predicate)}
+    if field_plan.kind == FIELD_KIND_SET:
+        definition["@container"] = "@set"
+        field_plan = field_plan.item
+
+    if field_plan.kind == FIELD_KIND_IRI:
+        definition["@type"] = "@id"
+    elif field_plan.kind == FIELD_KIND_LITERAL:
+        if field_plan.datatype is not None:
+            definition["@type"] = text_type(field_plan.datatype)
+        elif field_plan.language:
+            definition["@language"] = field_plan.language
+    return definition
+
+
+class JsonLdPlan(object):
+    """
+    The JSON-LD rendering of a serializer class: an ``@context`` with one term per field (named after the field) plus
+    the prefixes from ``Meta.rdf_prefixes``, and the steps to turn an object into a node using that context.
+
+    The terms of nested serializers are merged into the same context, so one ``@context`` covers the whole document.
+    Collapsed nested objects are rendered into the node of their parent.  If two fields want the same term name with
+    different meanings, the later one is keyed by its full predicate IRI instead.
+    """
+    def __init__(self, serializer_class, context=None, plans=None):
+        self.serializer_class = serializer_class
+        self.context = context if context is not None else {}
+        # The plans sharing this context, so that recursive serializers don't recurse forever.
+        self.plans = plans if plans is not None else {}
+        self.plans[serializer_class] = self
+        for prefix, uri in serializer_class.namespace_manager.items():
+            self.context.setdefault(prefix, text_type(uri))
+
+        plan = serializer_class.plan
+        self.subject_field = plan.subject_field
+        self.rdf_type = text_type(plan.rdf_type) if plan.rdf_type is not None else None
+        self.entries = [self._compile_entry(field_plan) for field_plan in plan.fields]
+
+    def _compile_entry(self, field_plan):
+        if field_plan.collapse and field_plan.kind != FIELD_KIND_SET:
+            return None, field_plan, self._nested_plan(field_plan.field), None
+
+        key = field_plan.name
+        definition = term_definition(field_plan)
+        existing = self.context.get(key)
+        if existing is None:
+            self.context[key] = definition
+        elif existing != definition:
+            key = definition["@id"]
+            if "@container" in definition:
+                definition = {"@container": "@set"}
+            else:
+                definition = {}
+
+        item_plan = field_plan.item if field_plan.kind == FIELD_KIND_SET else field_plan
+        nested = None
+        if item_plan.kind not in (FIELD_KIND_LITERAL, FIELD_KIND_IRI):
+            nested = self._nested_plan(item_plan.field)
+        return key, field_plan, nested, definition
+
+    def _nested_plan(self, field):
+        serializer_class = getattr(field, "serializer_class", None)
+        if getattr(serializer_class, "plan", None) is None:
+            raise ValueError("{} cannot be rendered as JSON-LD; only fields of RdfSerializers can.".format(
+                field.object_field_name))
+        plan = self.plans.get(serializer_class)
+        if plan is None:
+            plan = JsonLdPlan(serializer_class, self.context, self.plans)
+        return plan
+
+    def render(self, obj, with_subject=True, visited=None):
+        """
+        Renders ``obj`` as a node.  ``visited`` is the RenderedNodes of the document being rendered, if any.
+        """
+        if visited is None:
+            visited = RenderedNodes()
+        reference = visited.reference(obj)
+        if reference is not None:
+            return reference
+
+        node = {}
+        if with_subject and self.subject_field is not None:
+            node["@id"] = self.subject_field.render(getattr(obj, self.subject_field.object_field_name))
+        if self.rdf_type is not None:
+            node["@type"] = self.rdf_type
+        visited.add(obj, node)
+        self.render_into(node, obj, visited)
+        return node
+
+    def render_into(self, node, obj, visited):
+        for key, field_plan, nested, definition in self.entries:
+            value = getattr(obj, field_plan.name, None)
+            if value is None:
+                continue
+            if key is None:
+                if not visited.collapse(value, node):
+                    continue
+                nested.render_into(node, value, visited)
+                if nested.rdf_type is not None:
+                    node["@type"] = _merge_types(node.get("@type"), nested.rdf_type)
+                continue
+
+            if field_plan.kind == FIELD_KIND_SET:
+                items = [self._render_value(field_plan.item, nested, definition, item, visited)
+                         for item in value if item is not None]
+                # Nested objects without any properties don't produce any triples, so they're left out here too.
+                items = [item for item in items if item != {}]
+                if not items:
+                    continue
+                if field_plan.collapse:
+                    node[key] = items
+                else:
+                    node[key] = {key: items}
+            else:
+                rendered = self._render_value(field_plan, nested, definition, value, visited)
+                if rendered != {}:
+                    node[key] = rendered
+
+    @staticmethod
+    def _render_value(field_plan, nested, definition, value, visited):
+        if nested is not None:
+            return nested.render(value, with_subject=False, visited=visited)
+
+        rendered = field_plan.field.render(value)
+        if field_plan.kind == FIELD_KIND_IRI:
+            if "@type" in definition:
+                return rendered
+            return {"@id": rendered}
+
+        if isinstance(rendered, string_types) and field_plan.datatype is None:
+            if field_plan.language and "@language" not in definition:
+                return {"@value": rendered, "@language": field_plan.language}
+            return rendered
+        if isinstance(rendered, (bool,) + number_types) and field_plan.datatype is None and not field_plan.language:
+            return rendered
+
+        literal = rdf.Literal(rendered, field_plan.language, field_plan.datatype)
+        if literal.datatype is not None and definition.get("@type") != text_type(literal.datatype):
+            return {"@value": text_type(literal), "@type": text_type(literal.datatype)}
+        if literal.language and definition.get("@language") != literal.language:
+            return {"@value": text_type(literal), "@language": literal.language}
+        return text_type(literal)
+
+
+class RenderedNodes(object):
+    """
+    The nodes rendered so far for one document, by the id of their object, so that an object that is referred to
+    again (including through a cycle) becomes a reference to its first node instead of being rendered again.  Nodes
+    without an ``@id`` are given a blank node label the first time they're referred to.
+    """
+    def __init__(self):
+        self.nodes = {}
+        self.collapsed = set()
+        self.labels = 0
+
+    def add(self, obj, node):
+        self.nodes[id(obj)] = (obj, node)
+
+    def reference(self, obj):
+        entry = self.nodes.get(id(obj))
+        if entry is None:
+            return None
+        node = entry[1]
+        if "@id" not in node:
+            node["@id"] = "_:b{}".format(self.labels)
+            self.labels += 1
+        return {"@id": node["@id"]}
+
+    def collapse(self, obj, node):
+        """
+        Returns False if ``obj`` has already been collapsed into ``node``.
+        """
+        key = (id(obj), id(node))
+        if key in self.collapsed:
+            return False
+        self.collapsed.add(key)
+        return True
+
+
+def _merge_types(existing, rdf_type):
+    if existing is None:
+        return rdf_type
+    if not isinstance(existing, list):
+        existing = [existing]
+    if rdf_type not in existing:
+        existing = existing + [rdf_type]
+    return existing
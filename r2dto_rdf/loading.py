@@ -0,0 +1,172 @@
+from __future__ import unicode_literals
+
+from r2dto.base import DefaultModel
+from r2dto_rdf import rdf
+from r2dto_rdf.fields import FIELD_KIND_LITERAL, FIELD_KIND_IRI, FIELD_KIND_SET
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+def get_load_plan(serializer_class):
+    """
+    Returns the LoadPlan of ``serializer_class``, building it the first time it is asked for.
+    """
+    plan = serializer_class.__dict__.get("_load_plan")
+    if plan is None:
+        plan = LoadPlan(serializer_class)
+        serializer_class._load_plan = plan
+    return plan
+
+
+def index_triples(triples):
+    """
+    Groups ``triples`` by subject in a single pass.  Returns a dict of subject to a list of (predicate, object) pairs.
+    """
+    index = {}
+    for s, p, o in triples:
+        properties = index.get(s)
+        if properties is None:
+            properties = index[s] = []
+        properties.append((p, o))
+    return index
+
+
+class GraphLookup(object):
+    """
+    A lazy stand-in for ``index_triples(graph)`` that only looks at the subjects that are asked for.  Used when
+    loading a handful of subjects from a graph that is too big to index.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.cache = {}
+
+    def get(self, subject, default=None):
+        properties = self.cache.get(subject)
+        if properties is None:
+            properties = self.cache[subject] = list(self.graph.predicate_objects(subject))
+        return properties or default
+
+
+def accepts(field_plan, o):
+    kind = field_plan.kind
+    if kind == FIELD_KIND_LITERAL:
+        return isinstance(o, rdf.Literal) and (field_plan.datatype is None or o.datatype == field_plan.datatype)
+    if kind == FIELD_KIND_IRI:
+        return isinstance(o, rdf.URIRef)
+    if kind == FIELD_KIND_SET:
+        if not field_plan.collapse:
+            return isinstance(o, rdf.BNode)
+        return accepts(field_plan.item, o)
+    return isinstance(o, (rdf.URIRef, rdf.BNode))
+
+
+class LoadPlan(object):
+    """
+    Turns the triples about a subject back into a model object for one serializer class.
+
+    ``fields_by_predicate`` is the reverse of the serializer's plan: each predicate maps to the FieldPlans that use
+    it, so loading a subject is one pass over its (predicate, object) pairs.  Models are created from ``Meta.model``
+    with ``Meta.model_init_args`` and ``Meta.model_init_kwargs`` like r2dto does.
+    """
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        options = serializer_class.options
+        self.model_class = getattr(options, "model", DefaultModel)
+        self.model_init_args = getattr(options, "model_init_args", ())
+        self.model_init_kwargs = getattr(options, "model_init_kwargs", {})
+
+        plan = serializer_class.plan
+        self.subject_field = plan.subject_field
+        self.rdf_type = plan.rdf_type
+        self.fields_by_predicate = {}
+        self.collapsed_fields = []
+        for field_plan in plan.fields:
+            if field_plan.collapse and field_plan.kind != FIELD_KIND_SET:
+                self.collapsed_fields.append(field_plan)
+            elif field_plan.predicate is not None:
+                self.fields_by_predicate.setdefault(field_plan.predicate, []).append(field_plan)
+
+    def find_subjects(self, index):
+        """
+        Returns the subjects in ``index`` that are instances of ``Meta.rdf_type``, or, if the serializer has no
+        type, the subjects that aren't referenced by any other subject.
+        """
+        if self.rdf_type is not None:
+            return [s for s, properties in index.items() if (rdf.RDF.type, self.rdf_type) in properties]
+        referenced = {o for properties in index.values() for _, o in properties}
+        return [s for s in index if s not in referenced]
+
+    def load(self, subject, index, loaded=None):
+        """
+        Creates a model object for ``subject`` from ``index``, a mapping of subject to (predicate, object) pairs.
+        ``loaded`` maps the nodes that have already been loaded in this run to their objects, so shared and cyclic
+        references come back as the same object.
+        """
+        if loaded is None:
+            loaded = {}
+        obj = loaded.get(subject)
+        if obj is not None:
+            return obj
+
+        obj = self.model_class(*self.model_init_args, **self.model_init_kwargs)
+        loaded[subject] = obj
+        if self.subject_field is not None and not isinstance(subject, rdf.BNode):
+            setattr(obj, self.subject_field.object_field_name, self.subject_field.clean(text_type(subject)))
+
+        assigned = set()
+        for p, o in index.get(subject, ()):
+            for field_plan in self.fields_by_predicate.get(p, ()):
+                if accepts(field_plan, o):
+                    self._assign(obj, field_plan, o, index, loaded, assigned)
+                    break
+
+        for field_plan in self.collapsed_fields:
+            nested = self._nested_plan(field_plan)
+            if nested is not None:
+                setattr(obj, field_plan.name, nested.load(subject, index, {}))
+
+        return obj
+
+    def _assign(self, obj, field_plan, o, index, loaded, assigned):
+        # The first value wins for single valued fields, and sets replace whatever the model started out with.
+        if field_plan.kind == FIELD_KIND_SET:
+            if field_plan.name in assigned:
+                items = getattr(obj, field_plan.name)
+            else:
+                items = []
+                setattr(obj, field_plan.name, items)
+                assigned.add(field_plan.name)
+            if field_plan.collapse:
+                items.append(self._convert(field_plan.item, o, index, loaded))
+            else:
+                # The items of a non-collapsed set hang off of their own blank node.
+                for item_p, item_o in index.get(o, ()):
+                    if item_p == field_plan.predicate and accepts(field_plan.item, item_o):
+                        items.append(self._convert(field_plan.item, item_o, index, loaded))
+        elif field_plan.name not in assigned:
+            setattr(obj, field_plan.name, self._convert(field_plan, o, index, loaded))
+            assigned.add(field_plan.name)
+
+    def _convert(self, field_plan, o, index, loaded):
+        kind = field_plan.kind
+        if kind == FIELD_KIND_LITERAL:
+            data = o.toPython()
+            if isinstance(data, rdf.Literal):
+                data = text_type(data)
+            return field_plan.field.clean(data)
+        if kind == FIELD_KIND_IRI:
+            return field_plan.field.clean(text_type(o))
+        nested = self._nested_plan(field_plan)
+        if nested is None:
+            return None
+        return nested.load(o, index, loaded)
+
+    @staticmethod
+    def _nested_plan(field_plan):
+        serializer_class = getattr(field_plan.field, "serializer_class", None)
+        if getattr(serializer_class, "plan", None) is None:
+            return None
+        return get_load_plan(serializer_class)
@@ -4,7 +4,12 @@ import r2dto
 
 from r2dto_rdf.serializer import RdfSerializerMetaclass, RdfSerializer, BaseRdfSerializer
 from r2dto_rdf.fields import RdfField, RdfIriField, RdfObjectField, RdfStringField, RdfSetField, RdfBooleanField, \
-    RdfIntegerField, RdfFloatField, RdfDateTimeField, RdfDateField, RdfTimeField, RdfUuidField
+    RdfIntegerField, RdfFloatField, RdfDateTimeField, RdfDateField, RdfTimeField, RdfUuidField, SerializerReference
+
+# Serializers that have already been generated, by the arguments they were generated from, and the ones that are
+# being generated right now.
+_generated_serializers = {}
+_generating_serializers = set()
 
 
 class FieldTypeMappingError(ValueError):
@@ -65,6 +70,27 @@ def predicate_satisfied(field):
 
 
 def create_rdf_serializer_from_r2dto_serializer(serializer_class, rdf=None, meta=None, name=None, bases=None):
+    """
+    Returns an RdfSerializer for the r2dto serializer ``serializer_class``.  Each r2dto serializer (with a given
+    ``Rdf`` class and options) is only mapped once; asking again returns the same class.  A serializer that is asked
+    for while it is still being mapped, i.e. one that refers to itself, is referred to lazily.
+    """
+    key = (serializer_class, rdf, meta, name, tuple(bases or ()))
+    ret = _generated_serializers.get(key)
+    if ret is not None:
+        return ret
+    if key in _generating_serializers:
+        return SerializerReference(lambda: _generated_serializers[key])
+
+    _generating_serializers.add(key)
+    try:
+        ret = _generated_serializers[key] = _create_rdf_serializer(serializer_class, rdf, meta, name, bases)
+    finally:
+        _generating_serializers.discard(key)
+    return ret
+
+
+def _create_rdf_serializer(serializer_class, rdf, meta, name, bases):
     bases = bases or ()
     # Cast 'Rdf' prefix to string to make it compatible with both python 2 and 3
     name = name or str("Rdf") + serializer_class.__name__
@@ -83,9 +109,9 @@ def create_rdf_serializer_from_r2dto_serializer(serializer_class, rdf=None, meta
         if not rdf:
             raise ValueError("An Rdf class MUST be defined on the serializer.")
     overrides = {}
-    for name, attr in vars(rdf).items():
+    for field_name, attr in vars(rdf).items():
         if isinstance(attr, RdfField):
-            overrides[name] = attr
+            overrides[field_name] = attr
 
     rdf_fields = []
     for field in serializer_class.fields:
@@ -0,0 +1,173 @@
+"""
+Counters for long running services.  Metrics are off by default; ``enable_metrics()`` installs a MetricsRegistry that
+``build_graph``, ``build_graph_many``, ``build_many_parallel``, ``write_ntriples``, ``write_turtle``,
+``iter_sparql_inserts``, ``iter_sparql_updates`` and validation update from then on::
+
+    registry = enable_metrics()
+    ...
+    response_body = registry.to_prometheus()
+
+Everything is updated once per call (not per object or per triple), so the cost is small even when metrics are on.
+The methods that return iterators are recorded when the iterator is exhausted or closed.
+"""
+from __future__ import unicode_literals
+
+from collections import namedtuple
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# The active MetricsRegistry, or None.
+active = None
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+
+class Sample(namedtuple("Sample", ("name", "labels", "value"))):
+    """
+    One value of a metric.  ``labels`` is a tuple of (name, value) pairs.
+    """
+    __slots__ = ()
+
+
+class Counter(object):
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield Sample(self.name, tuple(zip(self.label_names, labels)), value)
+
+
+class Histogram(object):
+    def __init__(self, name, documentation, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count, sum]
+        self.values = {}
+
+    def observe(self, labels, value):
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-2] += 1
+        counts[-1] += value
+
+    def samples(self):
+        for labels, counts in sorted(self.values.items()):
+            labels = tuple(zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, counts):
+                yield Sample(self.name + "_bucket", labels + (("le", _format_value(bound)),), count)
+            yield Sample(self.name + "_bucket", labels + (("le", "+Inf"),), counts[-2])
+            yield Sample(self.name + "_count", labels, counts[-2])
+            yield Sample(self.name + "_sum", labels, counts[-1])
+
+
+class MetricsRegistry(object):
+    """
+    Holds the counters and histograms of r2dto_rdf.  Updates are serialized with a lock so a registry can be shared
+    by the threads of a server.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.lock = threading.Lock()
+        self.objects = Counter("r2dto_rdf_objects_serialized_total", "Objects serialized.",
+                               ("serializer", "operation"))
+        self.triples = Counter("r2dto_rdf_triples_emitted_total", "Triples emitted.", ("serializer", "operation"))
+        self.seconds = Histogram("r2dto_rdf_serialization_seconds", "Time spent in each serialization call.",
+                                 ("serializer", "operation"), buckets)
+        self.bytes_written = Counter("r2dto_rdf_bytes_written_total", "Bytes written by the streaming writers.",
+                                     ("serializer", "writer"))
+        self.validation_failures = Counter("r2dto_rdf_validation_failures_total",
+                                           "Objects that failed validation, by the field that failed.",
+                                           ("serializer", "field"))
+        self.metrics = (self.objects, self.triples, self.seconds, self.bytes_written, self.validation_failures)
+
+    def observe_serialization(self, serializer_class, operation, objects, triples, seconds, writer=None,
+                              bytes_written=0):
+        labels = (serializer_class.__name__, operation)
+        with self.lock:
+            self.objects.inc(labels, objects)
+            self.triples.inc(labels, triples)
+            self.seconds.observe(labels, seconds)
+            if writer is not None:
+                self.bytes_written.inc((serializer_class.__name__, writer), bytes_written)
+
+    def observe_validation_failure(self, serializer_class, fields):
+        with self.lock:
+            for field in fields:
+                self.validation_failures.inc((serializer_class.__name__, field))
+
+    def samples(self):
+        """
+        Returns a list of (metric, [Sample, ...]) pairs.
+        """
+        with self.lock:
+            return [(metric, list(metric.samples())) for metric in self.metrics]
+
+    def dump(self, callback):
+        """
+        Calls ``callback(sample)`` with every Sample, e.g. to forward them to statsd or another metrics library.
+        """
+        for _, samples in self.samples():
+            for sample in samples:
+                callback(sample)
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric, samples in self.samples():
+            metric_type = "histogram" if isinstance(metric, Histogram) else "counter"
+            lines.append("# HELP {} {}".format(metric.name, metric.documentation))
+            lines.append("# TYPE {} {}".format(metric.name, metric_type))
+            for sample in samples:
+                labels = ",".join('{}="{}"'.format(k, _escape_label(v)) for k, v in sample.labels)
+                lines.append("{}{{{}}} {}".format(sample.name, labels, _format_value(sample.value)))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            for metric in self.metrics:
+                metric.values.clear()
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def enable_metrics(registry=None):
+    """
+    Starts recording metrics in ``registry`` (a new MetricsRegistry by default) and returns it.
+    """
+    global active
+    if registry is None:
+        registry = MetricsRegistry()
+    active = registry
+    return registry
+
+
+def disable_metrics():
+    global active
+    active = None
@@ -0,0 +1,48 @@
+from __future__ import unicode_literals
+
+from r2dto_rdf import rdf
+
+
+class NamespaceRegistry(object):
+    """
+    The prefixes of every serializer class in the process.
+
+    ``namespace`` hands out one shared Namespace per IRI, and ``term_cache`` one shared dict of resolved terms per
+    set of prefix bindings, so classes with the same ``Meta.rdf_prefixes`` resolve each CURIE once between them.
+
+    The first class to bind a prefix defines it for the registry.  ``register`` reports later classes that bind it to
+    something else; the metaclass warns about them, or refuses to create the class if ``strict`` is True.
+    """
+    def __init__(self, strict=False):
+        self.strict = strict
+        self.prefixes = {}
+        self._namespaces = {}
+        self._term_caches = {}
+
+    def namespace(self, uri):
+        ns = self._namespaces.get(uri)
+        if ns is None:
+            ns = self._namespaces[uri] = rdf.Namespace(uri)
+        return ns
+
+    def register(self, prefixes):
+        """
+        Records ``prefixes`` (a mapping of prefix to namespace IRI) and returns a list of the ones that conflict with
+        an earlier definition.
+        """
+        conflicts = []
+        for prefix, uri in sorted(prefixes.items()):
+            existing = self.prefixes.setdefault(prefix, self.namespace(uri))
+            if existing != uri:
+                conflicts.append("Prefix {} is bound to {} but was already bound to {}.".format(prefix, uri, existing))
+        return conflicts
+
+    def term_cache(self, namespaces):
+        key = frozenset((prefix, str(ns)) for prefix, ns in namespaces.items())
+        cache = self._term_caches.get(key)
+        if cache is None:
+            cache = self._term_caches[key] = {}
+        return cache
+
+
+registry = NamespaceRegistry()
@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+from collections import deque
+import io
+import itertools
+
+from r2dto_rdf.context import SerializationContext, BlankNodeAllocator, random_blank_node_prefix
+from r2dto_rdf.writers import NTriplesWriter
+
+PARALLEL_FORMATS = ("nt", "nq")
+
+
+def serialize_chunk(task):
+    """
+    Serializes one chunk of objects in a worker process.  ``task`` is (serializer_class, objects, graph_name,
+    blank_node_prefix).  Returns the N-Triples (or N-Quads) of the chunk encoded as UTF-8 bytes and the number of
+    triples in it.
+    """
+    serializer_class, objects, graph_name, blank_node_prefix = task
+    out = io.BytesIO()
+    writer = NTriplesWriter(out, graph_name=graph_name)
+    serializer = serializer_class()
+    context = SerializationContext(blank_nodes=BlankNodeAllocator(blank_node_prefix))
+    for obj in objects:
+        serializer.object = obj
+        context.visited.clear()
+        writer.write_triples(serializer.iter_triples(context=context))
+    writer.flush()
+    return out.getvalue(), writer.triples
+
+
+def iter_chunks(objects, chunk_size):
+    objects = iter(objects)
+    while True:
+        chunk = list(itertools.islice(objects, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_parallel_chunks(serializer_class, objects, workers=None, format="nt", graph_name=None, chunk_size=1000,
+                         deterministic=False):
+    """
+    Splits ``objects`` into chunks of ``chunk_size`` and serializes them in a pool of ``workers`` processes (one per
+    core by default).  Yields (bytes, triple count) for each chunk in the order of ``objects``.
+
+    The blank nodes of each chunk are labelled with the run's prefix plus the number of the chunk, so they're unique
+    across workers.  With ``deterministic`` the run's prefix is fixed.
+
+    At most two chunks per worker are in flight at a time, so ``objects`` can be a generator over far more objects
+    than fit in memory.  The serializer class and the objects have to be picklable.
+    """
+    if format not in PARALLEL_FORMATS:
+        raise ValueError("format must be one of {}.  Got {}.".format(PARALLEL_FORMATS, format))
+    if format == "nq" and graph_name is None:
+        raise ValueError("A graph_name MUST be provided to write N-Quads.")
+    if format == "nt":
+        graph_name = None
+
+    run_prefix = "b" if deterministic else random_blank_node_prefix()
+    tasks = ((serializer_class, chunk, graph_name, "{}{}_".format(run_prefix, i))
+             for i, chunk in enumerate(iter_chunks(objects, chunk_size)))
+    # multiprocessing is slow to import and only needed here.
+    import multiprocessing
+
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        for task in tasks:
+            yield serialize_chunk(task)
+        return
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(serialize_chunk, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
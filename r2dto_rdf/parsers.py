@@ -0,0 +1,191 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import re
+
+from r2dto_rdf import rdf
+from r2dto_rdf.fields import is_skolem_node
+
+_TERM = (r"(?:<([^>]*)>"
+         r"|_:([A-Za-z0-9_](?:[A-Za-z0-9_.\-]*[A-Za-z0-9_\-])?)"
+         r"|\"((?:[^\"\\]|\\.)*)\"(?:@([a-zA-Z]+(?:-[a-zA-Z0-9]+)*)|\^\^<([^>]*)>)?)")
+
+NTRIPLES_LINE = re.compile(r"^[ \t]*{0}[ \t]*{0}[ \t]*{0}[ \t]*(?:{0}[ \t]*)?\.[ \t]*(?:#.*)?$".format(_TERM))
+NTRIPLES_ESCAPE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+NTRIPLES_ECHARS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", "\"": "\"", "'": "'", "\\": "\\"}
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+
+def _unescape_match(match):
+    if match.group(3) is not None:
+        return NTRIPLES_ECHARS.get(match.group(3), match.group(0))
+    return unichr(int(match.group(1) or match.group(2), 16))
+
+
+def nt_unescape(s):
+    if "\\" not in s:
+        return s
+    return NTRIPLES_ESCAPE.sub(_unescape_match, s)
+
+
+def _to_term(groups):
+    iri, bnode, lexical, language, datatype = groups
+    if iri is not None:
+        return rdf.URIRef(nt_unescape(iri))
+    if bnode is not None:
+        return rdf.BNode(bnode)
+    if lexical is None:
+        return None
+    if datatype is not None:
+        return rdf.Literal(nt_unescape(lexical), datatype=rdf.URIRef(nt_unescape(datatype)))
+    return rdf.Literal(nt_unescape(lexical), lang=language)
+
+
+def iter_lines(source, encoding="utf-8"):
+    """
+    Yields the lines of ``source`` as text.  ``source`` can be a file opened in text or binary mode, an mmap, or any
+    iterable of lines.
+    """
+    if hasattr(source, "readline"):
+        first = source.readline()
+        lines = iter(source.readline, first[:0])
+        if first:
+            yield first.decode(encoding) if isinstance(first, bytes) else first
+    else:
+        lines = iter(source)
+    for line in lines:
+        yield line.decode(encoding) if isinstance(line, bytes) else line
+
+
+def iter_ntriples(source, encoding="utf-8"):
+    """
+    Parses N-Triples (or N-Quads, ignoring the graph) from ``source`` one line at a time and yields (s, p, o)
+    triples.  Raises ValueError on a malformed line.
+    """
+    for line_number, line in enumerate(iter_lines(source, encoding), 1):
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+        match = NTRIPLES_LINE.match(line)
+        if match is None:
+            raise ValueError("Invalid N-Triples on line {}: {}".format(line_number, line))
+        groups = match.groups()
+        yield _to_term(groups[0:5]), _to_term(groups[5:10]), _to_term(groups[10:15])
+
+
+def iter_subject_groups(triples):
+    """
+    Groups consecutive triples with the same subject.  Yields (subject, [(predicate, object), ...]).
+    """
+    subject = None
+    properties = None
+    for s, p, o in triples:
+        if s != subject:
+            if properties:
+                yield subject, properties
+            subject = s
+            properties = []
+        properties.append((p, o))
+    if properties:
+        yield subject, properties
+
+
+class StreamingLoader(object):
+    """
+    Materializes objects from a stream of triples using a LoadPlan, holding on to at most ``max_pending`` subjects
+    at a time.
+
+    The root subjects are the instances of ``Meta.rdf_type``, or, for serializers without a type, the subjects that
+    are IRIs.  Everything else (the blank nodes of nested objects) is kept in a pending buffer until the root that
+    refers to it is loaded.  A root is loaded once a later root has started and every blank node it refers to has
+    arrived.  That means the triples of one root have to be together, as they are in the depth first output of
+    ``write_ntriples`` or in a dump sorted by line; its blank nodes may come before or after it.  If the buffer fills
+    up the oldest root is loaded with whatever has arrived for it, so ``max_pending`` should be larger than the
+    number of nodes in the biggest object.
+
+    The nodes of ``Meta.rdf_skolemize`` serializers are only written once, for the first root that refers to them,
+    so they stay in the buffer after that root is loaded.  Like any other node no root has claimed, they're dropped
+    oldest first once the buffer fills up; a root that refers to one after that loads without it.
+    """
+    def __init__(self, load_plan, max_pending=10000):
+        self.load_plan = load_plan
+        self.max_pending = max_pending
+        self.nodes = OrderedDict()
+        self.roots = OrderedDict()
+
+    def is_root(self, subject, properties):
+        if self.load_plan.rdf_type is not None:
+            return (rdf.RDF.type, self.load_plan.rdf_type) in properties
+        return not isinstance(subject, rdf.BNode)
+
+    def iter_objects(self, triples):
+        for subject, properties in iter_subject_groups(triples):
+            existing = self.nodes.get(subject)
+            if existing is None:
+                self.nodes[subject] = existing = properties
+            else:
+                existing.extend(properties)
+
+            if subject not in self.roots and self.is_root(subject, properties):
+                # A new root means the ones before it are done.
+                for obj in self._load_ready():
+                    yield obj
+                self.roots[subject] = True
+
+            while len(self.nodes) > self.max_pending:
+                oldest = next(iter(self.roots), None)
+                if oldest is not None and oldest != subject:
+                    yield self._load(oldest, self._reachable(oldest)[0])
+                    continue
+                # Nothing has claimed this node so far, and there's no room to wait any longer.
+                orphan = next((node for node in self.nodes if node not in self.roots), None)
+                if orphan is None:
+                    break
+                del self.nodes[orphan]
+
+        for root in list(self.roots):
+            yield self._load(root, self._reachable(root)[0])
+
+    def _load_ready(self):
+        for root in list(self.roots):
+            reachable, complete = self._reachable(root)
+            if complete:
+                yield self._load(root, reachable)
+
+    def _reachable(self, root):
+        reachable = [root]
+        seen = {root}
+        complete = True
+        for node in reachable:
+            for _, o in self.nodes.get(node, ()):
+                if isinstance(o, rdf.BNode) and o not in seen:
+                    seen.add(o)
+                    if o in self.nodes:
+                        reachable.append(o)
+                    else:
+                        complete = False
+        return reachable, complete
+
+    def _load(self, root, reachable):
+        del self.roots[root]
+        obj = self.load_plan.load(root, self.nodes)
+        shared = self._shared(reachable)
+        for node in reachable:
+            if node not in shared:
+                self.nodes.pop(node, None)
+        return obj
+
+    def _shared(self, reachable):
+        # Skolemized nodes (and what hangs off of them) are only written for the first root that refers to them.
+        shared = [node for node in reachable if is_skolem_node(node)]
+        seen = set(shared)
+        for node in shared:
+            for _, o in self.nodes.get(node, ()):
+                if isinstance(o, rdf.BNode) and o not in seen:
+                    seen.add(o)
+                    shared.append(o)
+        return seen
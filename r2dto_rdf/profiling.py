@@ -0,0 +1,126 @@
+"""
+Opt-in instrumentation of serialization and validation.  While ``profile()`` is active every serializer class
+records, for itself and for each of its fields, how many times it was called, how long it took and how many triples
+it emitted::
+
+    with RdfSerializer.profile() as profiler:
+        ModelSerializer.build_graph_many(objects)
+    print(profiler.format_report())
+
+Times are inclusive: the time of a nested object or set field includes the time of the serializers it uses, which
+have entries of their own.  When no profiler is active the only cost is one attribute check per object.
+"""
+from __future__ import unicode_literals
+
+from collections import namedtuple
+from contextlib import contextmanager
+
+from r2dto_rdf import rdf
+from r2dto_rdf.context import SerializationContext
+from r2dto_rdf.fields import MISSING, check_value, iter_plan_triples
+from r2dto_rdf.metrics import clock
+
+PHASE_SERIALIZE = "serialize"
+PHASE_VALIDATE = "validate"
+
+
+class ProfileEntry(namedtuple("ProfileEntry", ("serializer_class", "field", "phase", "calls", "time", "triples"))):
+    """
+    The totals for one serializer class (``field`` is None) or one of its fields in one ``phase``, either
+    ``PHASE_SERIALIZE`` or ``PHASE_VALIDATE``.  ``time`` is in seconds.
+    """
+    __slots__ = ()
+
+
+class Profiler(object):
+    """
+    Collects ProfileEntries.  The triples of each field are gathered into a list while the field is timed, so
+    profiled runs aren't as lazy as normal ones.
+    """
+    def __init__(self):
+        # (serializer_class, field name or None, phase) -> [calls, time, triples]
+        self.stats = {}
+        self._field_plans = {}
+
+    def _record(self, key, elapsed, triples):
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = [0, 0.0, 0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += triples
+
+    def _single_field_plans(self, serializer_class):
+        plans = self._field_plans.get(serializer_class)
+        if plans is None:
+            plan = serializer_class.plan
+            plans = [(field_plan.name, plan._replace(fields=(field_plan,), rdf_type=None))
+                     for field_plan in plan.fields]
+            self._field_plans[serializer_class] = plans
+        return plans
+
+    def iter_plan_triples(self, serializer_class, obj, subject_node, context):
+        start = clock()
+        triples = []
+        failed = context.failed_fields(serializer_class)
+        for name, field_plan in self._single_field_plans(serializer_class):
+            field_start = clock()
+            field_triples = list(iter_plan_triples(field_plan, obj, subject_node, context, failed))
+            self._record((serializer_class, name, PHASE_SERIALIZE), clock() - field_start, len(field_triples))
+            triples.extend(field_triples)
+        rdf_type = serializer_class.plan.rdf_type
+        if rdf_type is not None:
+            triples.append((subject_node, rdf.RDF.type, rdf_type))
+        self._record((serializer_class, None, PHASE_SERIALIZE), clock() - start, len(triples))
+        return iter(triples)
+
+    def check_object(self, serializer_class, obj, failed=None):
+        start = clock()
+        errors = []
+        for validation_plan in serializer_class.plan.validation:
+            field_start = clock()
+            error_count = len(errors)
+            check_value(validation_plan, getattr(obj, validation_plan.name, MISSING), errors)
+            if failed is not None and len(errors) != error_count:
+                failed.append(validation_plan.name)
+            self._record((serializer_class, validation_plan.name, PHASE_VALIDATE), clock() - field_start, 0)
+        self._record((serializer_class, None, PHASE_VALIDATE), clock() - start, 0)
+        return errors
+
+    def report(self):
+        """
+        Returns the ProfileEntries, slowest first.
+        """
+        entries = [ProfileEntry(key[0], key[1], key[2], stat[0], stat[1], stat[2]) for key, stat in self.stats.items()]
+        entries.sort(key=lambda entry: entry.time, reverse=True)
+        return entries
+
+    def format_report(self):
+        lines = ["{:<40} {:<9} {:>10} {:>10} {:>10}".format("serializer.field", "phase", "calls", "ms", "triples")]
+        for entry in self.report():
+            name = entry.serializer_class.__name__
+            if entry.field is not None:
+                name = "{}.{}".format(name, entry.field)
+            lines.append("{:<40} {:<9} {:>10} {:>10.3f} {:>10}".format(name, entry.phase, entry.calls,
+                                                                       entry.time * 1000, entry.triples))
+        return "\n".join(lines)
+
+    def clear(self):
+        self.stats.clear()
+        self._field_plans.clear()
+
+
+@contextmanager
+def profile(profiler=None):
+    """
+    Records every serialization and validation run in ``profiler`` (a new Profiler by default) until the block
+    ends.  Yields the profiler.
+    """
+    if profiler is None:
+        profiler = Profiler()
+    previous = SerializationContext.profiler
+    SerializationContext.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        SerializationContext.profiler = previous
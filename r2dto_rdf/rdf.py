@@ -0,0 +1,35 @@
+"""
+The parts of rdflib that r2dto_rdf uses.  Importing rdflib takes longer than importing everything else put together,
+so nothing is imported until one of the names here is first used.  Use ``from r2dto_rdf import rdf`` and
+``rdf.URIRef`` rather than importing from rdflib directly.
+"""
+from __future__ import unicode_literals
+
+import importlib
+import sys
+
+SOURCES = {
+    "BNode": "rdflib",
+    "Graph": "rdflib",
+    "Literal": "rdflib",
+    "Namespace": "rdflib",
+    "RDF": "rdflib",
+    "URIRef": "rdflib",
+    "XSD": "rdflib",
+    "Store": "rdflib.store",
+    "Node": "rdflib.term",
+}
+
+
+def __getattr__(name):
+    module = SOURCES.get(name)
+    if module is None:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    value = globals()[name] = getattr(importlib.import_module(module), name)
+    return value
+
+
+if sys.version_info < (3, 7):
+    # Modules can't have a __getattr__ before python 3.7, so everything is imported up front.
+    for _name in SOURCES:
+        __getattr__(_name)
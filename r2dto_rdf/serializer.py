@@ -1,13 +1,22 @@
 from __future__ import unicode_literals
 
-import uuid
+from collections import namedtuple
+import warnings
 
 import r2dto
-from rdflib import Namespace, URIRef, BNode, Graph, Literal, RDF
-from rdflib.term import Node
-
-from r2dto_rdf.fields import RdfField, RdfIriField
+from r2dto_rdf import metrics, rdf
+from r2dto_rdf.codegen import install_generated_methods
+from r2dto_rdf.context import SerializationContext
+from r2dto_rdf.diff import diff_objects
+from r2dto_rdf.fields import RdfField, RdfIriField, MISSING, check_value, iter_plan_triples
 from r2dto_rdf.errors import ValidationError
+from r2dto_rdf.jsonld import get_jsonld_plan
+from r2dto_rdf.namespaces import registry as namespace_registry
+from r2dto_rdf.loading import get_load_plan, index_triples, GraphLookup
+from r2dto_rdf.parallel import iter_parallel_chunks
+from r2dto_rdf.parsers import StreamingLoader, iter_ntriples
+from r2dto_rdf.profiling import profile
+from r2dto_rdf.writers import NTriplesWriter, TurtleWriter, iter_sparql_updates
 
 
 def split_prefix(raw, prefixes=None):
@@ -20,20 +29,42 @@ def split_prefix(raw, prefixes=None):
 
 
 class RdflibNamespaceManager(object):
-    def __init__(self):
+    """
+    The prefixes of one serializer class.  The Namespaces and resolved terms are shared through ``registry`` with
+    every other class that binds the same prefixes, so resolving a CURIE is usually a dict lookup.
+    """
+    def __init__(self, registry=namespace_registry):
+        self.registry = registry
         self.namespaces = {}
+        self._terms = registry.term_cache(self.namespaces)
 
     def bind(self, prefix, uri):
-        ns = Namespace(uri)
+        ns = self.registry.namespace(uri)
         self.namespaces[prefix] = ns
+        self._terms = self.registry.term_cache(self.namespaces)
         return ns
 
     def resolve_term(self, raw):
-        prefix, postfix = split_prefix(raw, self.namespaces)
-        if prefix:
-            return self.namespaces[prefix][postfix]
-        else:
-            return URIRef(postfix)
+        term = self._terms.get(raw)
+        if term is None:
+            prefix, postfix = split_prefix(raw, self.namespaces)
+            if prefix:
+                term = self.namespaces[prefix][postfix]
+            else:
+                term = rdf.URIRef(postfix)
+            self._terms[raw] = term
+        return term
+
+    def bind_graph(self, graph):
+        """
+        Binds the prefixes to ``graph`` straight through its store, skipping the checks of ``Graph.bind``.
+        """
+        for prefix, ns in self.namespaces.items():
+            graph.store.bind(prefix, ns)
+        return graph
+
+    def new_graph(self):
+        return self.bind_graph(rdf.Graph())
 
     def __getitem__(self, item):
         return self.namespaces[item]
@@ -42,7 +73,80 @@ class RdflibNamespaceManager(object):
         return self.namespaces.items()
 
 
+BulkBuildResult = namedtuple("BulkBuildResult", ("graph", "objects", "triples"))
+
+
+class SerializerPlan(namedtuple("SerializerPlan", ("subject_field", "fields", "rdf_type", "validation",
+                                                   "subject_validation"))):
+    """
+    Everything build_graph and validate need to know about a serializer class, resolved once when the class is
+    created.
+
+    ``fields`` is a tuple of FieldPlans for every field except the subject field, ``rdf_type`` is the resolved
+    ``Meta.rdf_type`` URIRef (or None) and ``validation`` is a tuple of ValidationPlans for every field.
+    ``subject_validation`` is the ValidationPlan of the subject field, if there is one.
+    """
+    __slots__ = ()
+
+
+def compile_plan(fields, options, namespace_manager):
+    subject_field = getattr(options, "rdf_subject_field", None)
+    field_plans = tuple(field.compile(namespace_manager) for field in fields if field is not subject_field)
+    rdf_type = None
+    if options.rdf_type:
+        rdf_type = namespace_manager.resolve_term(options.rdf_type)
+    validation = tuple(field.compile_validation() for field in fields)
+    subject_validation = subject_field.compile_validation() if subject_field is not None else None
+    return SerializerPlan(subject_field, field_plans, rdf_type, validation, subject_validation)
+
+
+def _triple_sort_key(triple):
+    return tuple(term.n3() for term in triple)
+
+
+class _BulkCounter(object):
+    """
+    Counts the objects and triples that go through a lazy bulk serialization for the metrics registry.
+    """
+    def __init__(self):
+        self.objects = 0
+        self.triples = 0
+
+    def iter_objects(self, objects):
+        for obj in objects:
+            self.objects += 1
+            yield obj
+
+    def iter_triples(self, triples):
+        for triple in triples:
+            self.triples += 1
+            yield triple
+
+    def iter_chunks(self, chunks):
+        for data, triple_count in chunks:
+            self.triples += triple_count
+            yield data
+
+
+def _observe_bulk(registry, serializer_class, operation, writer, counter, chunks):
+    """
+    Yields ``chunks`` and records the whole run with ``registry`` once, when it's exhausted or closed.
+    """
+    start = metrics.clock()
+    bytes_written = 0
+    try:
+        for chunk in chunks:
+            bytes_written += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode("utf-8"))
+            yield chunk
+    finally:
+        registry.observe_serialization(serializer_class, operation, counter.objects, counter.triples,
+                                       metrics.clock() - start, writer, bytes_written)
+
+
 class RdfSerializerMetaclass(type):
+    # The default for Meta.rdf_defer.
+    defer_configuration = False
+
     def __new__(cls, name, bases, attrs):
         fields = []
         for k, v in attrs.items():
@@ -73,135 +177,520 @@ class RdfSerializerMetaclass(type):
         if not hasattr(options, "rdf_type"):
             options.rdf_type = None
 
-        namespace_manager = RdflibNamespaceManager()
-        for k, v in options.rdf_prefixes.items():
-            namespace_manager.bind(k, v)
+        if not hasattr(options, "rdf_skolemize"):
+            options.rdf_skolemize = False
 
-        errors = []
-        for field in fields:
-            erm = field.get_configuration_errors()
-            if erm:
-                errors.append("{}.{}: {}".format(name, field.object_field_name, erm))
+        if not hasattr(options, "rdf_codegen"):
+            options.rdf_codegen = False
 
-        if errors:
-            raise ValueError("Configuration Error: {}".format("\n".join(errors)))
+        if not hasattr(options, "rdf_defer"):
+            options.rdf_defer = cls.defer_configuration
 
         new_class_attrs = {k: v for k, v in attrs.items() if not isinstance(v, RdfField)}
         new_class_attrs["fields"] = fields
         new_class_attrs["options"] = options
-        new_class_attrs["namespace_manager"] = namespace_manager
         ret = super(RdfSerializerMetaclass, cls).__new__(cls, name, bases, new_class_attrs)
         for field in fields:
             field.parent = ret
+        if options.rdf_defer:
+            ret.namespace_manager = DeferredConfiguration("namespace_manager")
+            ret.plan = DeferredConfiguration("plan")
+        else:
+            configure_serializer_class(ret)
         return ret
 
 
+def configure_serializer_class(serializer_class):
+    """
+    Checks the configuration of a serializer class, sets up its prefixes and compiles its plan.  This is done when
+    the class is created, or, with ``Meta.rdf_defer``, the first time the class's ``plan`` or ``namespace_manager``
+    is needed.
+    """
+    name = serializer_class.__name__
+    options = serializer_class.options
+    namespace_manager = RdflibNamespaceManager()
+    for k, v in options.rdf_prefixes.items():
+        namespace_manager.bind(k, v)
+
+    errors = []
+    conflicts = namespace_manager.registry.register(options.rdf_prefixes)
+    if conflicts and namespace_manager.registry.strict:
+        errors.extend("{}: {}".format(name, conflict) for conflict in conflicts)
+    elif conflicts:
+        warnings.warn("Conflicting prefixes in {}: {}".format(name, " ".join(conflicts)), stacklevel=3)
+    for field in serializer_class.fields:
+        erm = field.get_configuration_errors()
+        if erm:
+            errors.append("{}.{}: {}".format(name, field.object_field_name, erm))
+
+    if errors:
+        raise ValueError("Configuration Error: {}".format("\n".join(errors)))
+
+    serializer_class.namespace_manager = namespace_manager
+    serializer_class.plan = compile_plan(serializer_class.fields, options, namespace_manager)
+    if options.rdf_codegen:
+        install_generated_methods(serializer_class)
+
+
+class DeferredConfiguration(object):
+    """
+    Stands in for the ``plan`` and ``namespace_manager`` of a class whose configuration is deferred.  Reading either
+    one configures the class, which replaces both with the real thing.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        configure_serializer_class(owner)
+        return owner.__dict__[self.name]
+
+
 class BaseRdfSerializer(object):
     namespace_manager = None
     options = None
     fields = None
+    plan = None
 
     def __init__(self, object=None, data=None):
         self.object = object
         self.data = data
 
     def validate(self):
-        errors = []
-        for field in self.fields:
-            if field.required:
-                if not hasattr(self.object, field.object_field_name):
-                    errors.append("Field {} is missing from object.".format(field.object_field_name))
-                elif getattr(self.object, field.object_field_name) is None:
-                    errors.append("Field {} cannot be None.".format(field.object_field_name))
-
-            data = getattr(self.object, field.object_field_name, None)
-            if data is not None:
-                try:
-                    field.validate(data)
-                except ValidationError as ex:
-                    errors.extend(ex.errors)
-
-                if field.validators:
-                    validators = field.validators
-                    if not hasattr(validators, "__iter__"):
-                        validators = (validators,)
-
-                    for validator in validators:
-                        try:
-                            validator(data)
-                        except ValidationError as ex:
-                            errors.extend(ex.errors)
+        failed = [] if metrics.active is not None else None
+        errors = self._check_object(self.object, failed)
+        if errors:
+            self._fail_validation(self.object, errors, {type(self): failed})
+
+    @classmethod
+    def validate_object(cls, obj):
+        """
+        Validates ``obj`` without creating a serializer for it.  Subclasses that override ``validate`` are
+        instantiated and validated the old way.
+        """
+        if cls.overrides("validate"):
+            return cls(object=obj).validate()
 
+        failed = [] if metrics.active is not None else None
+        errors = cls._check_object(obj, failed)
         if errors:
-            raise ValidationError(errors)
+            cls._fail_validation(obj, errors, {cls: failed})
 
-    def build_graph(self, subject=None):
+    @classmethod
+    def _check_object(cls, obj, failed=None):
         """
-        Returns an list of lists of the form:
-        [[subject, [(predicate_one, value_one), (predicate_two, value_two)], ...]]]]
+        Returns the validation errors of ``obj``.  The names of the fields with errors are added to ``failed`` if it
+        is given.
         """
-        if not subject:
-            subject_field = self.options.rdf_subject_field
-            if subject_field:
-                subject_attr_data = getattr(self.object, subject_field.object_field_name)
-                subject_iri = subject_field.render(subject_attr_data)
-            else:
-                subject_iri = "_:" + uuid.uuid4().hex
-            subject_node = None
-        else:
-            if isinstance(subject, Node):
-                subject_node = subject
-            else:
-                subject_node = None
-            subject_field = None
-            subject_iri = subject
+        if SerializationContext.profiler is not None:
+            return SerializationContext.profiler.check_object(cls, obj, failed)
+        errors = []
+        if failed is None:
+            for validation_plan in cls.plan.validation:
+                check_value(validation_plan, getattr(obj, validation_plan.name, MISSING), errors)
+            return errors
+        for validation_plan in cls.plan.validation:
+            error_count = len(errors)
+            check_value(validation_plan, getattr(obj, validation_plan.name, MISSING), errors)
+            if len(errors) != error_count:
+                failed.append(validation_plan.name)
+        return errors
+
+    @classmethod
+    def _fail_validation(cls, obj, errors, failures=None):
+        """
+        Records the failure with the metrics registry and raises a ValidationError with ``errors``.  ``failures``
+        maps serializer classes to the names of their fields that failed, as collected while validating.
+        """
+        registry = metrics.active
+        if registry is not None:
+            failures = failures or {}
+            registry.observe_validation_failure(cls, failures.get(cls) or [""])
+            for serializer_class, fields in failures.items():
+                if serializer_class is not cls and fields:
+                    registry.observe_validation_failure(serializer_class, fields)
+        raise ValidationError(errors)
+
+    @staticmethod
+    def _validating_context():
+        context = SerializationContext(validate=True)
+        if metrics.active is not None:
+            context.failures = {}
+        return context
+
+    @classmethod
+    def overrides(cls, name):
+        """
+        Returns True if ``cls`` replaces the BaseRdfSerializer implementation of the method ``name``.
+        """
+        method = getattr(cls, name)
+        return getattr(method, "__func__", method) is not BaseRdfSerializer.__dict__[name]
 
-        g = Graph()
-        for k, v in self.namespace_manager.namespaces.items():
-            g.bind(k, v)
+    def build_graph(self, subject=None, context=None):
+        """
+        Returns an rdflib Graph containing the triples of ``iter_triples`` with the serializer's prefixes bound.
+        """
+        registry = metrics.active
+        if registry is not None:
+            start = metrics.clock()
+        g = self.namespace_manager.new_graph()
+        g.addN((s, p, o, g) for s, p, o in self.iter_triples(subject, context))
+        if registry is not None:
+            registry.observe_serialization(type(self), "build_graph", 1, len(g), metrics.clock() - start)
+        return g
 
-        if subject_node is None:
-            if subject_iri.startswith("_:"):
-                subject_node = BNode(subject_iri)
-            else:
-                subject_node = URIRef(subject_iri)
-
-        predicate_fields = [field for field in self.fields if field is not subject_field]
-        for field in predicate_fields:
-            obj = getattr(self.object, field.object_field_name)
-            if hasattr(field, "build_graph"):
-                if field.collapse:
-                    subobject_graph = field.build_graph(obj, subject_node)
-                else:
-                    blank_node_name = uuid.uuid4().hex
-                    blank_node = BNode(blank_node_name)
-                    subobject_graph = field.build_graph(obj, blank_node)
-                    if subobject_graph:
-                        predicate = self.namespace_manager.resolve_term(field.predicate)
-                        g.add((subject_node, predicate, blank_node))
-                if subobject_graph:
-                    g += subobject_graph
-            else:
-                raw_data = getattr(self.object, field.object_field_name, None)
-                if raw_data is not None:
-                    predicate = self.namespace_manager.resolve_term(field.predicate)
-                    rendered_data = field.render(raw_data)
+    def validate_and_build_graph(self, subject=None):
+        """
+        Does the work of ``validate`` followed by ``build_graph`` in a single walk of the object.  Every value is
+        validated as it is rendered, so nested objects are only visited once and set fields can be one-shot iterables.
+        Raises a ValidationError with all of the problems found if the object isn't valid.
+        """
+        context = self._validating_context()
+        g = self.build_graph(subject, context)
+        if context.errors:
+            self._fail_validation(self.object, context.errors, context.failures)
+        return g
 
-                    data_type = None
-                    if field.datatype and field.datatype[0] != "@":
-                        data_type = self.namespace_manager.resolve_term(field.datatype)
+    def iter_validated_triples(self, subject=None):
+        """
+        Like ``validate_and_build_graph`` but returns the list of triples instead of a Graph.
+        """
+        context = self._validating_context()
+        triples = list(self.iter_triples(subject, context))
+        if context.errors:
+            self._fail_validation(self.object, context.errors, context.failures)
+        return triples
+
+    @classmethod
+    def build_graph_many(cls, objects, graph=None, batch_size=10000, deterministic=False, terms=None):
+        """
+        Adds the triples of every object in ``objects`` to ``graph`` (a Graph or a Store, a new Graph by default) in
+        batches of ``batch_size``.  The prefixes are bound once.  If ``deterministic`` is True the blank node labels
+        are the same every time the same objects are added; see SerializationContext.  Passing a TermCache as
+        ``terms`` shares repeated IRIs and literals between the objects.
+
+        Returns a BulkBuildResult of the graph, the number of objects processed and the number of triples emitted.
+        """
+        registry = metrics.active
+        if registry is not None:
+            start = metrics.clock()
+        if graph is None:
+            graph = rdf.Graph()
+        elif isinstance(graph, rdf.Store):
+            graph = rdf.Graph(store=graph)
+        cls.namespace_manager.bind_graph(graph)
+
+        serializer = cls()
+        context = SerializationContext(deterministic=deterministic, terms=terms)
+        object_count = 0
+        triple_count = 0
+        batch = []
+        for obj in objects:
+            serializer.object = obj
+            context.visited.clear()
+            object_count += 1
+            for s, p, o in serializer.iter_triples(context=context):
+                batch.append((s, p, o, graph))
+            if len(batch) >= batch_size:
+                graph.addN(batch)
+                triple_count += len(batch)
+                batch = []
+
+        if batch:
+            graph.addN(batch)
+            triple_count += len(batch)
+
+        if registry is not None:
+            registry.observe_serialization(cls, "build_graph_many", object_count, triple_count,
+                                           metrics.clock() - start)
+        return BulkBuildResult(graph, object_count, triple_count)
+
+    @classmethod
+    def write_ntriples(cls, objects, fileobj, graph_name=None, buffer_size=1 << 16, deterministic=False,
+                       terms=None):
+        """
+        Streams the triples of every object in ``objects`` to ``fileobj`` as N-Triples, or as N-Quads in the graph
+        ``graph_name`` if one is given, without building a Graph.  Returns the number of triples written.  If
+        ``deterministic`` is True the same objects always produce the same output.  ``terms`` is an optional
+        TermCache.
+        """
+        registry = metrics.active
+        if registry is not None:
+            start = metrics.clock()
+        writer = NTriplesWriter(fileobj, graph_name=graph_name, buffer_size=buffer_size)
+        serializer = cls()
+        context = SerializationContext(deterministic=deterministic, terms=terms)
+        object_count = 0
+        for obj in objects:
+            serializer.object = obj
+            context.visited.clear()
+            object_count += 1
+            writer.write_triples(serializer.iter_triples(context=context))
+        writer.flush()
+        if registry is not None:
+            registry.observe_serialization(cls, "write_ntriples", object_count, writer.triples,
+                                           metrics.clock() - start, "ntriples", writer.bytes_written)
+        return writer.triples
+
+    @classmethod
+    def build_many_parallel(cls, objects, workers=None, format="nt", graph_name=None, chunk_size=1000,
+                            deterministic=False):
+        """
+        Serializes ``objects`` as N-Triples (``format="nt"``) or as N-Quads in the graph ``graph_name``
+        (``format="nq"``) across ``workers`` processes, one per core by default.  The objects are sent to the workers
+        in chunks of ``chunk_size``.
+
+        Returns an iterator over the UTF-8 encoded chunks in the order of ``objects``; concatenating them gives the
+        whole document, e.g. ``out.writelines(PersonSerializer.build_many_parallel(people))``.  The serializer class
+        has to be importable by the workers and the objects have to be picklable.
 
-                    if field.datatype == "@id":
-                        data = URIRef(rendered_data)
-                    else:
-                        data = Literal(rendered_data, field.language, data_type)
+        Each chunk gets its own blank node prefix.  If ``deterministic`` is True the output doesn't depend on the run
+        or on the number of workers.
+        """
+        registry = metrics.active
+        counter = _BulkCounter()
+        chunks = iter_parallel_chunks(cls, counter.iter_objects(objects), workers, format, graph_name, chunk_size,
+                                      deterministic)
+        if registry is None:
+            return (data for data, _ in chunks)
+        writer = "ntriples" if format == "nt" else "nquads"
+        return _observe_bulk(registry, cls, "build_many_parallel", writer, counter, counter.iter_chunks(chunks))
+
+    @classmethod
+    def write_turtle(cls, objects, fileobj, buffer_size=1 << 16, deterministic=False, terms=None):
+        """
+        Streams every object in ``objects`` to ``fileobj`` as Turtle, one subject block per object, using the
+        prefixes from ``Meta.rdf_prefixes``.  Returns the number of triples written.  If ``deterministic`` is True the
+        same objects always produce the same output.  ``terms`` is an optional TermCache.
+        """
+        registry = metrics.active
+        if registry is not None:
+            start = metrics.clock()
+        writer = TurtleWriter(fileobj, cls.namespace_manager.namespaces, buffer_size=buffer_size)
+        serializer = cls()
+        context = SerializationContext(deterministic=deterministic, terms=terms)
+        object_count = 0
+        for obj in objects:
+            serializer.object = obj
+            context.visited.clear()
+            object_count += 1
+            writer.write_block(serializer.iter_triples(context=context), shared=context.skolemized)
+        writer.flush()
+        if registry is not None:
+            registry.observe_serialization(cls, "write_turtle", object_count, writer.triples,
+                                           metrics.clock() - start, "turtle", writer.bytes_written)
+        return writer.triples
+
+    @classmethod
+    def iter_sparql_inserts(cls, objects, graph_name=None, max_triples=10000, max_bytes=1 << 20):
+        """
+        Yields SPARQL 1.1 Update bodies that ``INSERT DATA`` the triples of every object in ``objects``, into the
+        graph ``graph_name`` if one is given.  Each body declares the serializer's prefixes and holds whole objects
+        up to ``max_triples`` triples or ``max_bytes`` bytes; see SparqlUpdateWriter.
+        """
+        registry = metrics.active
+        counter = _BulkCounter()
+
+        def groups():
+            serializer = cls()
+            context = SerializationContext()
+            for obj in counter.iter_objects(objects):
+                serializer.object = obj
+                context.visited.clear()
+                # Each object may end up in a request of its own, so skolemized nodes are written out every time.
+                context.skolemized.clear()
+                yield counter.iter_triples(serializer.iter_triples(context=context)), ()
+        bodies = iter_sparql_updates(groups(), cls.namespace_manager.namespaces, graph_name, max_triples, max_bytes)
+        if registry is None:
+            return bodies
+        return _observe_bulk(registry, cls, "iter_sparql_inserts", "sparql_update", counter, bodies)
+
+    @classmethod
+    def iter_sparql_updates(cls, diffs, graph_name=None, max_triples=10000, max_bytes=1 << 20):
+        """
+        Like ``iter_sparql_inserts`` for an iterable of GraphDiffs (see ``diff``): each diff's removed triples are
+        deleted with ``DELETE DATA`` and its added triples inserted with ``INSERT DATA``.  ``DELETE DATA`` can't
+        contain blank nodes, so diffs that remove nested objects have to be made with an IRI base for
+        ``skolemize``.
+        """
+        registry = metrics.active
+        counter = _BulkCounter()
+        groups = ((counter.iter_triples(sorted(d.added, key=_triple_sort_key)),
+                   counter.iter_triples(sorted(d.removed, key=_triple_sort_key)))
+                  for d in counter.iter_objects(diffs))
+        bodies = iter_sparql_updates(groups, cls.namespace_manager.namespaces, graph_name, max_triples, max_bytes)
+        if registry is None:
+            return bodies
+        return _observe_bulk(registry, cls, "iter_sparql_updates", "sparql_update", counter, bodies)
+
+    @classmethod
+    def get_jsonld_context(cls):
+        """
+        Returns the JSON-LD ``@context`` generated for this class.  It is built once and shared, so don't modify it.
+        """
+        return get_jsonld_plan(cls).context
 
-                    g.add((subject_node, predicate, data))
+    def to_jsonld(self):
+        """
+        Renders the object as a compact JSON-LD document made of plain python dicts and lists, without going through
+        triples.
+        """
+        plan = get_jsonld_plan(type(self))
+        node = plan.render(self.object)
+        node["@context"] = plan.context
+        return node
 
-        if self.options.rdf_type:
-            g.add((subject_node, RDF.type, self.namespace_manager.resolve_term(self.options.rdf_type)))
+    @classmethod
+    def to_jsonld_many(cls, objects):
+        """
+        Renders all of ``objects`` as a single JSON-LD document with one shared ``@context`` and a ``@graph``.
+        """
+        plan = get_jsonld_plan(cls)
+        return {
+            "@context": plan.context,
+            "@graph": [plan.render(obj) for obj in objects],
+        }
 
-        return g
+    def load(self, subject):
+        """
+        Loads the object for ``subject`` out of the graph given as ``data``, sets it as this serializer's ``object``
+        and returns it.  Only the triples reachable from ``subject`` are looked at.
+        """
+        plan = get_load_plan(type(self))
+        self.object = plan.load(self.get_subject_node(subject), GraphLookup(self.data))
+        return self.object
+
+    @classmethod
+    def load_all(cls, graph):
+        """
+        Loads every instance of ``Meta.rdf_type`` in ``graph`` (or every subject that nothing refers to if the
+        serializer has no type) and returns a list of the objects.  The graph is indexed once for the whole call.
+        """
+        plan = get_load_plan(cls)
+        index = index_triples(graph)
+        loaded = {}
+        return [plan.load(subject, index, loaded) for subject in plan.find_subjects(index)]
+
+    @classmethod
+    def load_ntriples(cls, source, max_pending=10000):
+        """
+        Parses N-Triples from ``source`` (a text or binary file, an mmap or an iterable of lines) line by line and
+        yields the objects as they are completed.  At most ``max_pending`` subjects are buffered; see
+        StreamingLoader.
+        """
+        loader = StreamingLoader(get_load_plan(cls), max_pending)
+        return loader.iter_objects(iter_ntriples(source))
+
+    def iter_triples(self, subject=None, context=None):
+        """
+        Yields the (subject, predicate, object) triples for the object depth first.  Nested objects are yielded
+        right after the triple linking them to their parent.
+
+        If ``context`` is validating, every value is validated before it is rendered and the problems are added to
+        ``context.errors``.  Invalid values are left out.
+        """
+        if context is None:
+            context = SerializationContext()
+        subject = self._check_subject(self.object, subject, context)
+        subject_node = self.get_subject_node(subject, context)
+        context.visited.setdefault(id(self.object), (self.object, subject_node))
+        return self._iter_plan_triples(self.object, subject_node, context)
+
+    @classmethod
+    def iter_object_triples(cls, obj, subject=None, context=None):
+        """
+        Does what ``iter_triples`` does for ``obj`` without creating a serializer for it.  This is how nested objects
+        are rendered.  Subclasses that override ``iter_triples`` or ``get_subject_node`` are instantiated and
+        rendered the old way.
+        """
+        if context is None:
+            context = SerializationContext()
+        stateless = cls.__dict__.get("_stateless")
+        if stateless is None:
+            stateless = cls._stateless = not (cls.overrides("iter_triples") or cls.overrides("get_subject_node"))
+        if not stateless:
+            return cls(object=obj).iter_triples(subject, context)
+        subject = cls._check_subject(obj, subject, context)
+        subject_node = cls.get_object_subject_node(obj, subject, context)
+        context.visited.setdefault(id(obj), (obj, subject_node))
+        return cls._iter_plan_triples(obj, subject_node, context)
+
+    @classmethod
+    def emit(cls, obj, subject, sink, context=None):
+        """
+        Calls ``sink(s, p, o)`` for each triple of ``obj`` without creating a serializer for it.  ``sink`` can be,
+        for example, the ``write`` method of an NTriplesWriter.  Returns the number of triples emitted.
+        """
+        count = 0
+        for s, p, o in cls.iter_object_triples(obj, subject, context):
+            sink(s, p, o)
+            count += 1
+        return count
+
+    @classmethod
+    def _check_subject(cls, obj, subject, context):
+        # Only validating contexts check the subject field; an invalid subject is replaced so rendering can go on.
+        subject_validation = cls.plan.subject_validation
+        if context.errors is not None and subject_validation is not None:
+            subject_data = getattr(obj, subject_validation.name, MISSING)
+            error_count = len(context.errors)
+            valid = check_value(subject_validation, subject_data, context.errors)
+            if context.failures is not None and len(context.errors) != error_count:
+                context.failed_fields(cls).append(subject_validation.name)
+            if not valid and not subject:
+                # The object won't be returned anyway, so any node will do.
+                subject = context.new_blank_node()
+        return subject
+
+    @classmethod
+    def _iter_plan_triples(cls, obj, subject_node, context):
+        if context.profiler is not None:
+            return context.profiler.iter_plan_triples(cls, obj, subject_node, context)
+        return iter_plan_triples(cls.plan, obj, subject_node, context, context.failed_fields(cls))
+
+    @classmethod
+    def diff(cls, old, new, subject=None, skolemize=True):
+        """
+        Returns a GraphDiff with the ``added`` and ``removed`` triples that turn the triples of ``old`` into those of
+        ``new``.  Either can be None for an object that is being created or deleted.  Fields whose plain values are
+        equal are skipped; nested objects and sets are compared with set semantics.
+
+        Blank nodes are named after their content, the subject and the fields leading to them (see
+        ``Meta.rdf_skolemize``; ``skolemize`` is True or an IRI base), so unchanged nested values cancel out and
+        equal values of different objects don't share a node.  The nodes of nested serializers with an IRI base for
+        ``Meta.rdf_skolemize`` are shared by every object with an equal value, so only the links to them are ever
+        removed.  For the removed triples to match what's in a store, the object should have been written with
+        ``diff(None, obj).added`` in the first place.  Serializers without ``Meta.rdf_subject`` need a ``subject``.
+        """
+        return diff_objects(cls, old, new, subject, skolemize)
+
+    @staticmethod
+    def profile(profiler=None):
+        """
+        Returns a context manager that records where the time of every serializer class goes while it is active;
+        see r2dto_rdf.profiling.
+        """
+        return profile(profiler)
+
+    def get_subject_node(self, subject=None, context=None):
+        return self.get_object_subject_node(self.object, subject, context)
+
+    @classmethod
+    def get_object_subject_node(cls, obj, subject=None, context=None):
+        if isinstance(subject, rdf.Node):
+            return subject
+
+        if not subject:
+            subject_field = cls.plan.subject_field
+            if not subject_field:
+                if context is None:
+                    context = SerializationContext()
+                return context.new_blank_node()
+            subject_attr_data = getattr(obj, subject_field.object_field_name)
+            subject = subject_field.render(subject_attr_data)
+
+        if subject.startswith("_:"):
+            return rdf.BNode(subject[2:])
+        return rdf.URIRef(subject)
 
 
 class RdfSerializer(r2dto.base.with_metaclass(RdfSerializerMetaclass, BaseRdfSerializer)):
@@ -0,0 +1,58 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict, namedtuple
+
+from r2dto_rdf import rdf
+
+TermCacheInfo = namedtuple("TermCacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+
+class TermCache(object):
+    """
+    A bounded LRU cache of rdflib terms, so values that repeat from one object to the next (prefixes, enum-like
+    strings, booleans...) are only turned into a URIRef or a Literal once and the same term object is shared.
+
+    Literals are keyed on (type of value, value, datatype, language), since ``True == 1 == 1.0`` but they make
+    different literals.  ``info()`` returns the hit and miss counts in the same shape as ``functools.lru_cache``.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._terms = OrderedDict()
+
+    def literal(self, value, language=None, datatype=None):
+        try:
+            return self._get((type(value), value, datatype, language))
+        except KeyError:
+            return self._add((type(value), value, datatype, language), rdf.Literal(value, language, datatype))
+        except TypeError:
+            # Unhashable values can't be cached.
+            return rdf.Literal(value, language, datatype)
+
+    def iri(self, value):
+        try:
+            return self._get((rdf.URIRef, value))
+        except KeyError:
+            return self._add((rdf.URIRef, value), rdf.URIRef(value))
+
+    def _get(self, key):
+        term = self._terms.pop(key)
+        self._terms[key] = term
+        self.hits += 1
+        return term
+
+    def _add(self, key, term):
+        self.misses += 1
+        if len(self._terms) >= self.maxsize:
+            self._terms.popitem(last=False)
+        self._terms[key] = term
+        return term
+
+    def info(self):
+        return TermCacheInfo(self.hits, self.misses, self.maxsize, len(self._terms))
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self._terms.clear()
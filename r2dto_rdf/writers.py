@@ -0,0 +1,333 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import io
+import re
+
+from r2dto_rdf import rdf
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+NT_STRING_ESCAPES = {
+    ord("\\"): "\\\\",
+    ord("\""): "\\\"",
+    ord("\n"): "\\n",
+    ord("\r"): "\\r",
+    ord("\t"): "\\t",
+    ord("\b"): "\\b",
+    ord("\f"): "\\f",
+}
+
+NT_IRI_ESCAPES = {ord(c): "\\u{:04X}".format(ord(c)) for c in "<>\"{}|^`\\ "}
+NT_IRI_ESCAPES.update({c: "\\u{:04X}".format(c) for c in range(0x21)})
+
+
+def nt_escape_string(s):
+    return s.translate(NT_STRING_ESCAPES)
+
+
+def nt_escape_iri(iri):
+    return iri.translate(NT_IRI_ESCAPES)
+
+
+class BufferedWriter(object):
+    """
+    Collects output and writes it to ``fileobj`` in chunks of about ``buffer_size`` characters, so memory stays
+    bounded no matter how much is written.  ``fileobj`` can be opened in either text or binary mode.
+    ``bytes_written`` counts characters when ``fileobj`` is a text file.
+    """
+    def __init__(self, fileobj, buffer_size=1 << 16, encoding="utf-8"):
+        self.fileobj = fileobj
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.binary = not isinstance(fileobj, io.TextIOBase)
+        self.bytes_written = 0
+        self._buffer = []
+        self._buffered = 0
+
+    def write_text(self, text):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        if self.binary:
+            chunk = chunk.encode(self.encoding)
+        self.fileobj.write(chunk)
+        self.bytes_written += len(chunk)
+        self._buffer = []
+        self._buffered = 0
+
+
+class NTriplesWriter(BufferedWriter):
+    """
+    Writes triples as N-Triples lines (or N-Quads lines if ``graph_name`` is given) to ``fileobj``.
+
+    IRIs, which repeat far more than literals do, are formatted once and cached.
+    """
+    max_cached_terms = 10000
+
+    def __init__(self, fileobj, graph_name=None, buffer_size=1 << 16, encoding="utf-8"):
+        super(NTriplesWriter, self).__init__(fileobj, buffer_size, encoding)
+        self.triples = 0
+        self._terms = {}
+        self._datatypes = {}
+        if graph_name is not None:
+            self._line_end = " {} .\n".format(self.format_iri(rdf.URIRef(graph_name)))
+        else:
+            self._line_end = " .\n"
+
+    def format_iri(self, iri):
+        res = self._terms.get(iri)
+        if res is None:
+            if len(self._terms) >= self.max_cached_terms:
+                self._terms.clear()
+            res = self._terms[iri] = "<{}>".format(nt_escape_iri(iri))
+        return res
+
+    def format_term(self, term):
+        if isinstance(term, rdf.Literal):
+            lexical = "\"{}\"".format(nt_escape_string(term))
+            if term.language:
+                return "{}@{}".format(lexical, term.language)
+            if term.datatype is not None:
+                suffix = self._datatypes.get(term.datatype)
+                if suffix is None:
+                    suffix = self._datatypes[term.datatype] = "^^" + self.format_iri(term.datatype)
+                return lexical + suffix
+            return lexical
+        elif isinstance(term, rdf.BNode):
+            return "_:{}".format(term)
+        return self.format_iri(term)
+
+    def write(self, s, p, o):
+        self.triples += 1
+        self.write_text("".join((self.format_term(s), " ", self.format_iri(p), " ", self.format_term(o),
+                                 self._line_end)))
+
+    def write_triples(self, triples):
+        for s, p, o in triples:
+            self.write(s, p, o)
+
+
+TURTLE_LOCAL_NAME = re.compile(r"^([A-Za-z0-9_]([A-Za-z0-9_.-]*[A-Za-z0-9_-])?)?$", re.UNICODE)
+TURTLE_INTEGER = re.compile(r"^[+-]?[0-9]+$")
+
+
+class TurtleWriter(NTriplesWriter):
+    """
+    Writes Turtle to ``fileobj`` one block of triples at a time.
+
+    The ``@prefix`` header for ``namespaces`` (a mapping of prefix to namespace IRI) is written once up front.  Each
+    call to ``write_block`` then writes the triples of one object grouped by subject, with blank nodes that are only
+    referenced once inlined as ``[ ... ]``.  Only the current block is ever held in memory.
+    """
+    def __init__(self, fileobj, namespaces=None, buffer_size=1 << 16, encoding="utf-8"):
+        super(TurtleWriter, self).__init__(fileobj, buffer_size=buffer_size, encoding=encoding)
+        self.namespaces = sorted(((str(uri), prefix) for prefix, uri in (namespaces or {}).items()), reverse=True)
+        for uri, prefix in sorted(self.namespaces, key=lambda ns: ns[1]):
+            self.write_text("@prefix {}: <{}> .\n".format(prefix, nt_escape_iri(uri)))
+        if self.namespaces:
+            self.write_text("\n")
+
+    def format_iri(self, iri):
+        res = self._terms.get(iri)
+        if res is None:
+            if len(self._terms) >= self.max_cached_terms:
+                self._terms.clear()
+            res = self._terms[iri] = self._compact_iri(iri)
+        return res
+
+    def _compact_iri(self, iri):
+        # Reverse sorted so that the longest of two overlapping namespaces is tried first.
+        for uri, prefix in self.namespaces:
+            if iri.startswith(uri) and TURTLE_LOCAL_NAME.match(iri[len(uri):]):
+                return "{}:{}".format(prefix, iri[len(uri):])
+        return "<{}>".format(nt_escape_iri(iri))
+
+    def format_term(self, term):
+        if isinstance(term, rdf.Literal) and not term.language:
+            if term.datatype == rdf.XSD.integer and TURTLE_INTEGER.match(term):
+                return text_type(term)
+            if term.datatype == rdf.XSD.boolean and text_type(term) in ("true", "false"):
+                return text_type(term)
+        return super(TurtleWriter, self).format_term(term)
+
+    def write_block(self, triples, shared=()):
+        """
+        Writes the triples of one object, e.g. the output of ``iter_triples``.  Blank nodes in ``shared`` may be
+        referenced by other blocks, so they're never inlined.
+        """
+        subjects = OrderedDict()
+        references = {}
+        for s, p, o in triples:
+            self.triples += 1
+            subjects.setdefault(s, OrderedDict()).setdefault(p, []).append(o)
+            if isinstance(o, rdf.BNode):
+                references[o] = references.get(o, 0) + 1
+
+        inline = {node for node, count in references.items()
+                  if count == 1 and node in subjects and node not in shared}
+        pending = set(inline)
+        for subject, predicates in subjects.items():
+            if subject not in inline:
+                self._write_subject(subject, predicates, subjects, pending)
+        # Whatever is still pending is only reachable through a cycle of blank nodes.
+        for subject, predicates in subjects.items():
+            if subject in pending:
+                pending.discard(subject)
+                self._write_subject(subject, predicates, subjects, pending)
+
+    def _write_subject(self, subject, predicates, subjects, pending):
+        body = self._format_predicates(predicates, subjects, pending, 1)
+        self.write_text("{} {} .\n".format(self.format_term(subject), body))
+
+    def _format_predicates(self, predicates, subjects, pending, depth):
+        indent = "\n" + "    " * depth
+        parts = []
+        # rdf:type is conventionally written first as 'a'.
+        if rdf.RDF.type in predicates:
+            parts.append("a " + self._format_objects(predicates[rdf.RDF.type], subjects, pending, depth))
+        for predicate, objects in predicates.items():
+            if predicate != rdf.RDF.type:
+                parts.append(self.format_iri(predicate) + " " + self._format_objects(objects, subjects, pending, depth))
+        return (" ;" + indent).join(parts)
+
+    def _format_objects(self, objects, subjects, pending, depth):
+        res = []
+        for o in objects:
+            if o in pending:
+                # Each inlined node is only referenced once, so it can't be rendered twice (or recursively).
+                pending.discard(o)
+                res.append("[" + "\n" + "    " * (depth + 1) +
+                           self._format_predicates(subjects[o], subjects, pending, depth + 1) +
+                           "\n" + "    " * depth + "]")
+            else:
+                res.append(self.format_term(o))
+        return ", ".join(res)
+
+
+class SparqlUpdateWriter(object):
+    """
+    Collects groups of triples to insert and delete and turns them into SPARQL 1.1 Update request bodies of
+    ``DELETE DATA`` followed by ``INSERT DATA``, optionally inside ``GRAPH graph_name``.  Every body starts with a
+    ``PREFIX`` declaration for each of ``namespaces``.
+
+    A body is finished before the group that would take it over ``max_triples`` triples or ``max_bytes`` bytes of
+    UTF-8, so a body is only ever bigger than that if a single group is.  Groups are never split: the blank nodes of
+    an ``INSERT DATA`` only mean the same node within one request.  Within a body the last operation on a triple
+    wins, so the groups have the same effect as if they had been sent one by one.  ``DELETE DATA`` can't contain
+    blank nodes; deleting one raises a ValueError.
+    """
+    def __init__(self, namespaces=None, graph_name=None, max_triples=10000, max_bytes=1 << 20):
+        self.formatter = TurtleWriter(io.BytesIO(), namespaces)
+        self.header = "".join("PREFIX {}: <{}>\n".format(prefix, nt_escape_iri(uri))
+                              for uri, prefix in sorted(self.formatter.namespaces, key=lambda ns: ns[1]))
+        self.graph_name = graph_name
+        self.indent = "        " if graph_name is not None else "    "
+        self.max_triples = max_triples
+        self.max_bytes = max_bytes
+        # The encoded size of a body with both operations and no triples.
+        self.overhead = len(self._format_body([""], [""]).encode("utf-8"))
+        self.triples = 0
+        self.operations = OrderedDict()
+        self.size = self.overhead
+
+    def format_triple(self, s, p, o):
+        format_term = self.formatter.format_term
+        return "{} {} {} .".format(format_term(s), self.formatter.format_iri(p), format_term(o))
+
+    def write_group(self, inserts=(), deletes=()):
+        """
+        Adds the triples of one object or one diff.  The deletes are applied before the inserts.  Returns the body
+        that had to be finished to make room for the group, or None.
+        """
+        group = OrderedDict()
+        for s, p, o in deletes:
+            if isinstance(s, rdf.BNode) or isinstance(o, rdf.BNode):
+                raise ValueError("DELETE DATA can't contain blank nodes.  Got {} {} {}.".format(s, p, o))
+            group[self.format_triple(s, p, o)] = False
+        for triple in inserts:
+            group[self.format_triple(*triple)] = True
+        if not group:
+            return None
+
+        group_size = sum(len(line.encode("utf-8")) + len(self.indent) + 1 for line in group)
+        body = None
+        if self.operations and (len(self.operations) + len(group) > self.max_triples or
+                                self.size + group_size > self.max_bytes):
+            body = self.flush()
+        for line, insert in group.items():
+            if line not in self.operations:
+                self.size += len(line.encode("utf-8")) + len(self.indent) + 1
+            else:
+                # Moved to the end so the bodies come out in the order the triples went in.
+                del self.operations[line]
+            self.operations[line] = insert
+            self.triples += 1
+        return body
+
+    def flush(self):
+        """
+        Returns the body of everything written since the last one, or None if there is nothing to send.
+        """
+        if not self.operations:
+            return None
+        deletes = [line for line, insert in self.operations.items() if not insert]
+        inserts = [line for line, insert in self.operations.items() if insert]
+        self.operations = OrderedDict()
+        self.size = self.overhead
+        return self._format_body(deletes, inserts)
+
+    def _format_body(self, deletes, inserts):
+        parts = []
+        for operation, lines in (("DELETE DATA", deletes), ("INSERT DATA", inserts)):
+            if not lines:
+                continue
+            body = "".join(self.indent + line + "\n" for line in lines)
+            if self.graph_name is not None:
+                body = "    GRAPH {} {{\n{}    }}\n".format(self.formatter.format_iri(self.graph_name), body)
+            parts.append("{} {{\n{}}}".format(operation, body))
+        return self.header + " ;\n".join(parts) + "\n"
+
+
+def iter_sparql_updates(groups, namespaces=None, graph_name=None, max_triples=10000, max_bytes=1 << 20):
+    """
+    Yields the SPARQL Update bodies for ``groups``, an iterable of (inserts, deletes) pairs of triples.  See
+    SparqlUpdateWriter.
+    """
+    writer = SparqlUpdateWriter(namespaces, graph_name, max_triples, max_bytes)
+    for inserts, deletes in groups:
+        body = writer.write_group(inserts, deletes)
+        if body is not None:
+            yield body
+    body = writer.flush()
+    if body is not None:
+        yield body
+
+
+def post_sparql_updates(endpoint, bodies, timeout=60):
+    """
+    POSTs each of ``bodies`` to the SPARQL Update ``endpoint`` as ``application/sparql-update``, one after the
+    other.  Raises on the first request that fails.  Returns the number of requests sent.
+    """
+    try:
+        from urllib.request import Request, urlopen
+    except ImportError:
+        from urllib2 import Request, urlopen
+
+    count = 0
+    for body in bodies:
+        request = Request(endpoint, data=body.encode("utf-8"),
+                          headers={"Content-Type": "application/sparql-update; charset=utf-8"})
+        urlopen(request, timeout=timeout).close()
+        count += 1
+    return count
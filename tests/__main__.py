@@ -17,6 +17,16 @@ PEP8_EXCLUDES = (
 from tests.test_serializers import SerializerTests
 from tests.test_r2dto_mappings import R2DtoMappingTests
 from tests.test_fields import FieldTests
+from tests.test_writers import WriterTests
+from tests.test_jsonld import JsonLdTests
+from tests.test_loading import LoadingTests
+from tests.test_parsers import ParserTests
+from tests.test_terms import TermCacheTests
+from tests.test_profiling import ProfilingTests
+from tests.test_metrics import MetricsTests
+from tests.test_diff import DiffTests
+from tests.test_sparql import SparqlUpdateTests
+from tests.test_benchmarks import BenchmarkTests
 
 if __name__ == "__main__":
     pep8_sources = glob.glob("**/*.py") + glob.glob("tests/*.py") + glob.glob("r2dto_rdf/*.py")
@@ -0,0 +1,33 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from benchmarks import runner
+from benchmarks.workloads import WORKLOADS
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_workloads_run(self):
+        results = runner.run(WORKLOADS, size=10, repeat=1)
+        self.assertEqual({workload.name for workload in WORKLOADS}, set(results))
+        for name, result in results.items():
+            self.assertGreater(result["objects"], 0)
+            if not name.startswith("validate"):
+                self.assertGreater(result["triples"], 0)
+        self.assertIn("flat", runner.format_results(results))
+
+    def test_compare(self):
+        baseline = {
+            "flat": {"objects_per_second": 1000.0, "peak_memory": 1000},
+            "sets": {"objects_per_second": 1000.0, "peak_memory": None},
+        }
+        results = {
+            "flat": {"objects_per_second": 900.0, "peak_memory": 1500},
+            "sets": {"objects_per_second": 700.0, "peak_memory": 1000},
+            "nested": {"objects_per_second": 1.0, "peak_memory": 1},
+        }
+        regressions = runner.compare(results, baseline, threshold=0.2)
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(regressions[0].startswith("flat: peak memory"))
+        self.assertTrue(regressions[1].startswith("sets: 700 objects/s"))
+        self.assertEqual([], runner.compare(results, baseline, threshold=0.5))
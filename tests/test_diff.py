@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+import copy
+import unittest
+
+from rdflib import URIRef, Literal, RDF
+
+from r2dto_rdf import RdfSerializer, RdfStringField, RdfIntegerField, RdfObjectField, RdfSetField
+from r2dto_rdf.fields import SerializerReference
+
+from tests.utils import Model
+
+NS = "http://api.nickswebsite.net/ns/"
+
+
+class ItemSerializer(RdfSerializer):
+    name = RdfStringField(predicate="nws:name")
+    count = RdfIntegerField(predicate="nws:count")
+    parent = RdfObjectField(SerializerReference(lambda: ItemSerializer), predicate="nws:parent")
+
+    class Meta:
+        rdf_prefixes = {"nws": NS}
+
+
+class OrderSerializer(RdfSerializer):
+    name = RdfStringField(predicate="nws:name")
+    tags = RdfSetField(RdfStringField(), predicate="nws:tag")
+    items = RdfSetField(RdfObjectField(ItemSerializer), predicate="nws:item")
+    main = RdfObjectField(ItemSerializer, predicate="nws:main")
+
+    class Meta:
+        rdf_subject = "id"
+        rdf_type = "nws:Order"
+        rdf_prefixes = {"nws": NS}
+
+
+class DiffTests(unittest.TestCase):
+    def make_order(self):
+        items = [Model(name="Item {}".format(i), count=i) for i in range(3)]
+        return Model(id="http://api.nickswebsite.net/data#1", name="Order", tags=["a", "b"], items=items,
+                     main=items[0])
+
+    def test_literal_change(self):
+        old = self.make_order()
+        new = copy.deepcopy(old)
+        new.name = "Renamed"
+        added, removed = OrderSerializer.diff(old, new)
+        subject = URIRef(old.id)
+        self.assertEqual({(subject, URIRef(NS + "name"), Literal("Renamed"))}, added)
+        self.assertEqual({(subject, URIRef(NS + "name"), Literal("Order"))}, removed)
+        self.assertEqual((set(), set()), OrderSerializer.diff(old, copy.deepcopy(old)))
+
+    def test_set_and_nested_changes(self):
+        old = self.make_order()
+        new = copy.deepcopy(old)
+        new.tags.append("c")
+        new.items[2].count = 20
+        added, removed = OrderSerializer.diff(old, new)
+
+        subject = URIRef(old.id)
+        self.assertIn((subject, URIRef(NS + "tag"), Literal("c")), added)
+        # The changed item is a new node with all of its triples; the others are untouched.
+        self.assertEqual(4, len(added))
+        self.assertEqual(3, len(removed))
+        self.assertIn((Literal(20), Literal(2)), {(o, o2) for _, p, o in added for _, p2, o2 in removed
+                                                  if p == p2 == URIRef(NS + "count")})
+
+    def test_applying_diffs(self):
+        versions = [None, self.make_order()]
+        for _ in range(3):
+            new = copy.deepcopy(versions[-1])
+            new.items.append(Model(name="Item {}".format(len(new.items)), count=len(new.items)))
+            new.items[0].name = "Changed {}".format(len(new.items))
+            new.tags = new.tags[1:] + ["tag {}".format(len(new.items))]
+            versions.append(new)
+        versions.append(None)
+
+        store = set()
+        for old, new in zip(versions, versions[1:]):
+            added, removed = OrderSerializer.diff(old, new)
+            self.assertEqual(removed, removed & store)
+            store = (store - removed) | added
+            if new is not None:
+                self.assertEqual(OrderSerializer.diff(None, new).added, store)
+                self.assertIn((URIRef(new.id), RDF.type, URIRef(NS + "Order")), store)
+        self.assertEqual(set(), store)
+
+    def test_equal_nested_values_of_different_subjects(self):
+        base = "http://api.nickswebsite.net/.well-known/genid/"
+        a, b = self.make_order(), self.make_order()
+        b.id = "http://api.nickswebsite.net/data#2"
+        a_triples = OrderSerializer.diff(None, a, skolemize=base).added
+        b_triples = OrderSerializer.diff(None, b, skolemize=base).added
+        self.assertEqual(set(), {s for s, _, _ in a_triples} & {s for s, _, _ in b_triples})
+
+        renamed = copy.deepcopy(a)
+        renamed.items[0].name = "Renamed"
+        added, removed = OrderSerializer.diff(a, renamed, skolemize=base)
+        store = ((a_triples | b_triples) - removed) | added
+        self.assertEqual(OrderSerializer.diff(None, renamed, skolemize=base).added | b_triples, store)
+
+    def test_shared_skolemized_values(self):
+        class AddressSerializer(RdfSerializer):
+            street = RdfStringField(predicate="nws:street")
+
+            class Meta:
+                rdf_prefixes = {"nws": NS}
+                rdf_skolemize = "http://api.nickswebsite.net/.well-known/genid/"
+
+        class PersonSerializer(RdfSerializer):
+            address = RdfObjectField(AddressSerializer, predicate="nws:address")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_prefixes = {"nws": NS}
+
+        first = Model(id="http://api.nickswebsite.net/data#1", address=Model(street="Main"))
+        second = Model(id="http://api.nickswebsite.net/data#2", address=Model(street="Main"))
+        moved = Model(id=first.id, address=Model(street="Elm"))
+        second_triples = PersonSerializer.diff(None, second).added
+        store = PersonSerializer.diff(None, first).added | second_triples
+        main = [o for _, p, o in second_triples if p == URIRef(NS + "address")][0]
+        self.assertIn((URIRef(first.id), URIRef(NS + "address"), main), store)
+
+        added, removed = PersonSerializer.diff(first, moved)
+        self.assertEqual({(URIRef(first.id), URIRef(NS + "address"), main)}, removed)
+        store = (store - removed) | added
+        self.assertIn((main, URIRef(NS + "street"), Literal("Main")), store)
+        self.assertIn((URIRef(second.id), URIRef(NS + "address"), main), store)
+        self.assertTrue(PersonSerializer.diff(None, moved).added <= store)
+
+    def test_subject_changes(self):
+        old = self.make_order()
+        new = copy.deepcopy(old)
+        new.id = "http://api.nickswebsite.net/data#2"
+        added, removed = OrderSerializer.diff(old, new)
+        self.assertEqual({URIRef(new.id)}, {s for s, _, _ in added if isinstance(s, URIRef)})
+        self.assertEqual(len(added), len(removed))
+
+    def test_subject_required_without_rdf_subject(self):
+        item = Model(name="Item", count=1)
+        with self.assertRaises(ValueError):
+            ItemSerializer.diff(item, item)
+        added, removed = ItemSerializer.diff(None, item, subject="http://api.nickswebsite.net/data#item")
+        self.assertEqual(2, len(added))
+
+    def test_cycles(self):
+        old = self.make_order()
+        old.items[1].parent = old.items[1]
+        old.items[2].parent = old.items[0]
+        old.items[0].parent = old.items[2]
+        new = copy.deepcopy(old)
+        self.assertEqual((set(), set()), OrderSerializer.diff(old, new))
+        new.items[0].count = 5
+        added, removed = OrderSerializer.diff(old, new)
+        self.assertTrue(added)
+        self.assertTrue(removed)
@@ -94,6 +94,22 @@ class FieldTests(RdflibTestCaseMixin, unittest.TestCase):
         self.assert_triple(g, subject, p, "B")
         self.assert_triple(g, subject, p, "C")
 
+    def test_list_field_uses_parent_plan(self):
+        subject = URIRef("http://api.nickswebsite.net/data#1")
+        p = "http://api.nickswebsite.net/list-item"
+
+        class S(RdfSerializer):
+            items = RdfSetField(RdfStringField(), predicate=p)
+
+        f = S.plan.fields[0].field
+        self.assertIsInstance(f, RdfSetField)
+        self.assertIs(S.plan.fields[0], f.get_field_plan())
+        self.assertIs(f.get_field_plan(), f.get_field_plan())
+
+        g = f.build_graph(["A", "B"], subject)
+        self.assert_triple(g, subject, p, "A")
+        self.assert_triple(g, subject, p, "B")
+
     def test_object_field_collapsed(self):
         subject = URIRef("http://api.nickswebsite.net/data#2")
 
@@ -0,0 +1,127 @@
+from __future__ import unicode_literals
+
+import datetime
+import json
+import unittest
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from r2dto_rdf import RdfSerializer, RdfStringField, RdfDateField, RdfObjectField, RdfSetField, RdfBooleanField
+from r2dto_rdf.fields import SerializerReference
+
+from tests.test_writers import Person, PersonSerializer
+from tests.utils import Model, RdflibTestCaseMixin
+
+
+def parse_jsonld(document):
+    g = Graph()
+    g.parse(data=json.dumps(document), format="json-ld")
+    return g
+
+
+class JsonLdTests(RdflibTestCaseMixin, unittest.TestCase):
+    def test_context(self):
+        context = PersonSerializer.get_jsonld_context()
+
+        self.assertEqual("http://api.nickswebsite.net/ns/", context["nws"])
+        self.assertEqual({"@id": "http://api.nickswebsite.net/ns/homepage", "@type": "@id"}, context["homepage"])
+        self.assertEqual({"@id": "http://api.nickswebsite.net/ns/nickname", "@container": "@set"}, context["nicknames"])
+        self.assertEqual({"@id": "http://api.nickswebsite.net/ns/street", "@language": "en"}, context["street"])
+        self.assertIs(context, PersonSerializer.get_jsonld_context())
+
+    def test_to_jsonld(self):
+        person = Person(3)
+        document = PersonSerializer(object=person).to_jsonld()
+
+        self.assertEqual(person.id, document["@id"])
+        self.assertEqual("http://api.nickswebsite.net/ns/Person", document["@type"])
+        self.assertEqual(3, document["age"])
+        self.assertEqual({"street": "3 Main St"}, document["address"])
+        self.assertEqual(person.nicknames, document["nicknames"])
+
+        self.assertTrue(isomorphic(PersonSerializer(object=person).build_graph(), parse_jsonld(document)))
+
+    def test_to_jsonld_many(self):
+        people = [Person(i) for i in range(3)]
+        document = PersonSerializer.to_jsonld_many(people)
+
+        self.assertEqual(3, len(document["@graph"]))
+        self.assertTrue(isomorphic(PersonSerializer.build_graph_many(people).graph, parse_jsonld(document)))
+
+    def test_collapsed_objects_and_conflicting_terms(self):
+        class Detail(object):
+            def __init__(self):
+                self.name = "Detail"
+                self.active = True
+
+        class Model(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#1"
+                self.name = "Model"
+                self.created = datetime.date(2015, 3, 1)
+                self.detail = Detail()
+                self.details = [Detail(), Detail()]
+
+        class DetailSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:detail-name")
+            active = RdfBooleanField(predicate="nws:active")
+
+            class Meta:
+                rdf_type = "nws:Detail"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:name")
+            created = RdfDateField(predicate="nws:created")
+            detail = RdfObjectField(DetailSerializer, collapse=True)
+            details = RdfSetField(RdfObjectField(DetailSerializer), predicate="nws:detail")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        m = Model()
+        document = ModelSerializer(object=m).to_jsonld()
+
+        self.assertEqual("Model", document["name"])
+        self.assertEqual("Detail", document["http://api.nickswebsite.net/ns/detail-name"])
+        self.assertEqual("2015-03-01", document["created"])
+        self.assertEqual("http://api.nickswebsite.net/ns/Detail", document["@type"])
+        self.assertEqual(2, len(document["details"]))
+
+        # The document is plain json.
+        document = json.loads(json.dumps(document))
+        self.assertTrue(isomorphic(ModelSerializer(object=m).build_graph(), parse_jsonld(document)))
+
+    def test_shared_and_cyclic_objects(self):
+        class ChildSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:name")
+            parent = RdfObjectField(SerializerReference(lambda: ParentSerializer), predicate="nws:parent")
+            sibling = RdfObjectField(SerializerReference(lambda: ChildSerializer), predicate="nws:sibling")
+
+            class Meta:
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class ParentSerializer(RdfSerializer):
+            children = RdfSetField(RdfObjectField(ChildSerializer), predicate="nws:child")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        parent = Model(id="http://api.nickswebsite.net/data#parent")
+        one = Model(name="One", parent=parent)
+        two = Model(name="Two", parent=parent, sibling=one)
+        one.sibling = two
+        parent.children = [one, two]
+
+        document = ParentSerializer(object=parent).to_jsonld()
+        first, second = document["children"]
+        self.assertEqual({"@id": parent.id}, first["parent"])
+        self.assertEqual({"@id": parent.id}, first["sibling"]["parent"])
+        self.assertEqual({"@id": first["@id"]}, first["sibling"]["sibling"])
+        self.assertEqual({"@id": first["sibling"]["@id"]}, second)
+
+        document = json.loads(json.dumps(document))
+        self.assertTrue(isomorphic(ParentSerializer(object=parent).build_graph(), parse_jsonld(document)))
@@ -0,0 +1,105 @@
+from __future__ import unicode_literals
+
+import datetime
+import unittest
+import uuid
+
+from rdflib import Graph
+
+from r2dto_rdf import RdfSerializer, RdfStringField, RdfDateField, RdfUuidField, RdfObjectField, RdfSetField
+
+from tests.test_writers import Person, PersonSerializer
+
+
+class LoadingTests(unittest.TestCase):
+    def assert_person_equal(self, expected, person):
+        self.assertEqual(expected.id, person.id)
+        self.assertEqual(expected.name, person.name)
+        self.assertEqual(expected.age, person.age)
+        self.assertEqual(sorted(expected.nicknames), sorted(person.nicknames))
+        self.assertEqual(expected.address.street, person.address.street)
+        self.assertEqual(expected.homepage, person.homepage)
+
+    def test_load(self):
+        person = Person(4)
+        g = PersonSerializer.build_graph_many([Person(3), person, Person(5)]).graph
+
+        s = PersonSerializer(data=g)
+        loaded = s.load(person.id)
+
+        self.assertIs(loaded, s.object)
+        self.assert_person_equal(person, loaded)
+
+    def test_load_all(self):
+        people = {p.id: p for p in (Person(i) for i in range(10))}
+        g = PersonSerializer.build_graph_many(people.values()).graph
+        # Unrelated data is ignored.
+        g.parse(data="<http://example.com/a> <http://example.com/b> <http://example.com/c> .", format="nt")
+
+        loaded = PersonSerializer.load_all(g)
+
+        self.assertEqual(10, len(loaded))
+        for person in loaded:
+            self.assert_person_equal(people[person.id], person)
+
+    def test_load_model_types(self):
+        class Model(object):
+            def __init__(self, name):
+                self.name = name
+                self.id = None
+                self.created = None
+                self.uuid = None
+                self.uuid_iri = None
+                self.children = []
+                self.wrapper = None
+
+        class Wrapper(object):
+            pass
+
+        class ChildSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:child-name")
+
+            class Meta:
+                model = Model
+                model_init_args = ("unnamed",)
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class WrapperSerializer(RdfSerializer):
+            created = RdfDateField(predicate="nws:created")
+
+            class Meta:
+                model = Wrapper
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:name")
+            uuid = RdfUuidField(predicate="nws:uuid")
+            uuid_iri = RdfUuidField(predicate="nws:uuid", iri=True)
+            children = RdfSetField(RdfObjectField(ChildSerializer), predicate="nws:child", collapse=False)
+            wrapper = RdfObjectField(WrapperSerializer, collapse=True)
+
+            class Meta:
+                model = Model
+                model_init_kwargs = {"name": None}
+                rdf_subject = "id"
+                rdf_type = "nws:Model"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        m = Model("parent")
+        m.id = "http://api.nickswebsite.net/data#1"
+        m.uuid = uuid.uuid4()
+        m.uuid_iri = uuid.uuid4()
+        m.children = [Model("one"), Model("two")]
+        m.wrapper = Wrapper()
+        m.wrapper.created = datetime.date(2015, 3, 1)
+
+        g = Graph()
+        g.parse(data=ModelSerializer(object=m).build_graph().serialize(format="nt"), format="nt")
+        loaded, = ModelSerializer.load_all(g)
+
+        self.assertIsInstance(loaded, Model)
+        self.assertEqual("parent", loaded.name)
+        self.assertEqual(m.uuid, loaded.uuid)
+        self.assertEqual(m.uuid_iri, loaded.uuid_iri)
+        self.assertEqual({"one", "two"}, {child.name for child in loaded.children})
+        self.assertEqual(datetime.date(2015, 3, 1), loaded.wrapper.created)
@@ -0,0 +1,163 @@
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from r2dto_rdf import RdfSerializer, RdfStringField, RdfIntegerField, RdfObjectField, ValidationError
+from r2dto_rdf import metrics
+from r2dto_rdf.metrics import MetricsRegistry, enable_metrics, disable_metrics
+
+from tests.utils import Model
+
+
+class MetricsModelSerializer(RdfSerializer):
+    name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name", required=True)
+    count = RdfIntegerField(predicate="http://api.nickswebsite.net/ns/count")
+
+    class Meta:
+        rdf_subject = "id"
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = enable_metrics()
+
+    def tearDown(self):
+        disable_metrics()
+
+    def make_models(self, n):
+        return [Model(id="http://api.nickswebsite.net/data#{}".format(i), name="Name {}".format(i), count=i)
+                for i in range(n)]
+
+    def samples(self):
+        return {(sample.name, sample.labels): sample.value for _, samples in self.registry.samples()
+                for sample in samples}
+
+    def test_serialization_metrics(self):
+        models = self.make_models(3)
+        MetricsModelSerializer(object=models[0]).build_graph()
+        MetricsModelSerializer.build_graph_many(models)
+        out = io.BytesIO()
+        MetricsModelSerializer.write_ntriples(models, out)
+
+        samples = self.samples()
+        build_graph = (("serializer", "MetricsModelSerializer"), ("operation", "build_graph"))
+        write = (("serializer", "MetricsModelSerializer"), ("operation", "write_ntriples"))
+        self.assertEqual(1, samples[("r2dto_rdf_objects_serialized_total", build_graph)])
+        self.assertEqual(2, samples[("r2dto_rdf_triples_emitted_total", build_graph)])
+        self.assertEqual(3, samples[("r2dto_rdf_objects_serialized_total", write)])
+        self.assertEqual(6, samples[("r2dto_rdf_triples_emitted_total", write)])
+        self.assertEqual(1, samples[("r2dto_rdf_serialization_seconds_count", write)])
+        self.assertEqual(1, samples[("r2dto_rdf_serialization_seconds_bucket", write + (("le", "+Inf"),))])
+        bytes_labels = (("serializer", "MetricsModelSerializer"), ("writer", "ntriples"))
+        self.assertEqual(len(out.getvalue()), samples[("r2dto_rdf_bytes_written_total", bytes_labels)])
+
+    def test_lazy_bulk_metrics(self):
+        models = self.make_models(3)
+        chunks = list(MetricsModelSerializer.build_many_parallel(models, workers=1, chunk_size=2))
+        inserts = list(MetricsModelSerializer.iter_sparql_inserts(models, max_triples=2))
+        changed = Model(id=models[0].id, name="Changed", count=0)
+        updates = list(MetricsModelSerializer.iter_sparql_updates([MetricsModelSerializer.diff(models[0], changed)]))
+
+        samples = self.samples()
+        for operation, objects, triples in (("build_many_parallel", 3, 6), ("iter_sparql_inserts", 3, 6),
+                                            ("iter_sparql_updates", 1, 2)):
+            labels = (("serializer", "MetricsModelSerializer"), ("operation", operation))
+            self.assertEqual(objects, samples[("r2dto_rdf_objects_serialized_total", labels)])
+            self.assertEqual(triples, samples[("r2dto_rdf_triples_emitted_total", labels)])
+            self.assertEqual(1, samples[("r2dto_rdf_serialization_seconds_count", labels)])
+        bytes_written = samples[("r2dto_rdf_bytes_written_total",
+                                 (("serializer", "MetricsModelSerializer"), ("writer", "ntriples")))]
+        self.assertEqual(sum(len(chunk) for chunk in chunks), bytes_written)
+        bytes_written = samples[("r2dto_rdf_bytes_written_total",
+                                 (("serializer", "MetricsModelSerializer"), ("writer", "sparql_update")))]
+        self.assertEqual(sum(len(body.encode("utf-8")) for body in inserts + updates), bytes_written)
+
+    def test_validation_failures(self):
+        models = self.make_models(2)
+        models[0].name = None
+        models[1].count = "1"
+        models[1].name = None
+        for model in models:
+            with self.assertRaises(ValidationError):
+                MetricsModelSerializer(object=model).validate()
+        with self.assertRaises(ValidationError):
+            MetricsModelSerializer(object=models[0]).validate_and_build_graph()
+
+        samples = self.samples()
+        name = (("serializer", "MetricsModelSerializer"), ("field", "name"))
+        count = (("serializer", "MetricsModelSerializer"), ("field", "count"))
+        self.assertEqual(3, samples[("r2dto_rdf_validation_failures_total", name)])
+        self.assertEqual(1, samples[("r2dto_rdf_validation_failures_total", count)])
+
+    def test_nested_validation_failures(self):
+        for codegen in (False, True):
+            calls = []
+
+            def short(value):
+                calls.append(value)
+                if len(value) > 3:
+                    raise ValidationError(["too long"])
+
+            class ChildSerializer(RdfSerializer):
+                name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name", validators=[short])
+
+                class Meta:
+                    rdf_codegen = codegen
+
+            class ParentSerializer(RdfSerializer):
+                child = RdfObjectField(ChildSerializer, predicate="http://api.nickswebsite.net/ns/child")
+
+                class Meta:
+                    rdf_codegen = codegen
+
+            class GrandparentSerializer(RdfSerializer):
+                parent = RdfObjectField(ParentSerializer, predicate="http://api.nickswebsite.net/ns/parent")
+
+                class Meta:
+                    rdf_subject = "id"
+                    rdf_codegen = codegen
+
+            model = Model(id="http://api.nickswebsite.net/data#1", parent=Model(child=Model(name="Too long")))
+            for validate in (GrandparentSerializer(object=model).validate,
+                             GrandparentSerializer(object=model).validate_and_build_graph):
+                self.registry.clear()
+                del calls[:]
+                with self.assertRaises(ValidationError):
+                    validate()
+
+                failures = {labels: value for (name, labels), value in self.samples().items()
+                            if name == "r2dto_rdf_validation_failures_total"}
+                self.assertEqual({
+                    (("serializer", "ChildSerializer"), ("field", "name")): 1,
+                    (("serializer", "ParentSerializer"), ("field", "child")): 1,
+                    (("serializer", "GrandparentSerializer"), ("field", "parent")): 1,
+                }, failures)
+                self.assertEqual(["Too long"], calls)
+
+    def test_exposition(self):
+        registry = MetricsRegistry(buckets=(0.5, 1.0))
+        registry.observe_serialization(MetricsModelSerializer, "build_graph", 2, 5, 0.75)
+        registry.observe_validation_failure(MetricsModelSerializer, ["na\"me"])
+        text = registry.to_prometheus()
+        self.assertIn("# TYPE r2dto_rdf_serialization_seconds histogram\n", text)
+        labels = 'serializer="MetricsModelSerializer",operation="build_graph"'
+        self.assertIn("r2dto_rdf_objects_serialized_total{" + labels + "} 2\n", text)
+        self.assertIn("r2dto_rdf_serialization_seconds_bucket{" + labels + ',le="0.5"} 0\n', text)
+        self.assertIn("r2dto_rdf_serialization_seconds_bucket{" + labels + ',le="1.0"} 1\n', text)
+        self.assertIn("r2dto_rdf_serialization_seconds_sum{" + labels + "} 0.75\n", text)
+        self.assertIn('field="na\\"me"} 1\n', text)
+
+        dumped = []
+        registry.dump(dumped.append)
+        self.assertIn(("r2dto_rdf_triples_emitted_total",
+                       (("serializer", "MetricsModelSerializer"), ("operation", "build_graph")), 5), dumped)
+
+        registry.clear()
+        self.assertNotIn("MetricsModelSerializer", registry.to_prometheus())
+
+    def test_disabled(self):
+        disable_metrics()
+        self.assertIsNone(metrics.active)
+        MetricsModelSerializer(object=self.make_models(1)[0]).build_graph()
+        self.assertEqual({}, self.samples())
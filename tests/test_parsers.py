@@ -0,0 +1,95 @@
+from __future__ import unicode_literals
+
+import io
+import mmap
+import tempfile
+import unittest
+
+from rdflib import URIRef, BNode, Literal, XSD
+
+from r2dto_rdf import RdfSerializer, RdfStringField
+from r2dto_rdf.loading import get_load_plan
+from r2dto_rdf.parsers import StreamingLoader, iter_ntriples
+
+from tests import test_loading
+from tests.test_writers import Person, PersonSerializer
+from tests.utils import make_skolemized_serializer
+
+
+class ParserTests(unittest.TestCase):
+    assert_person_equal = test_loading.LoadingTests.__dict__["assert_person_equal"]
+
+    def test_iter_ntriples(self):
+        data = io.BytesIO(
+            b"# A comment\n"
+            b"\n"
+            b"<http://example.com/s> <http://example.com/p> \"a \\\"b\\\"\\n\\u2012\"@en-us .\n"
+            b"_:b1 <http://example.com/p> \"3\"^^<http://www.w3.org/2001/XMLSchema#integer> <http://example.com/g> .\n"
+            b"_:b1 <http://example.com/p> <http://example.com/o> . # trailing\n"
+        )
+        triples = list(iter_ntriples(data))
+        self.assertEqual([
+            (URIRef("http://example.com/s"), URIRef("http://example.com/p"),
+             Literal("a \"b\"\n\u2012", lang="en-us")),
+            (BNode("b1"), URIRef("http://example.com/p"), Literal("3", datatype=XSD.integer)),
+            (BNode("b1"), URIRef("http://example.com/p"), URIRef("http://example.com/o")),
+        ], triples)
+
+        self.assertRaises(ValueError, list, iter_ntriples(["<http://example.com/s> <http://example.com/p> ."]))
+
+    def test_load_ntriples(self):
+        people = [Person(i) for i in range(50)]
+        out = io.BytesIO()
+        PersonSerializer.write_ntriples(people, out)
+        out.seek(0)
+
+        loader = StreamingLoader(get_load_plan(PersonSerializer), max_pending=10)
+        loaded = list(loader.iter_objects(iter_ntriples(out)))
+
+        self.assertEqual(50, len(loaded))
+        for expected, person in zip(people, loaded):
+            self.assert_person_equal(expected, person)
+        self.assertEqual(0, len(loader.nodes))
+
+    def test_load_skolemized_ntriples(self):
+        HashedPersonSerializer = make_skolemized_serializer(True)
+        people = [Person(1) for _ in range(3)]
+        for i, person in enumerate(people):
+            person.id = "http://api.nickswebsite.net/data#{}".format(i)
+        out = io.BytesIO()
+        HashedPersonSerializer.write_ntriples(people, out)
+        out.seek(0)
+
+        loaded = list(HashedPersonSerializer.load_ntriples(out))
+        self.assertEqual(["1 Main St"] * 3, [person.address.street for person in loaded])
+
+    def test_load_sorted_ntriples_from_mmap(self):
+        people = {p.id: p for p in (Person(i) for i in range(10))}
+        g = PersonSerializer.build_graph_many(people.values()).graph
+        lines = sorted(g.serialize(format="nt", encoding="utf-8").splitlines(True))
+
+        with tempfile.TemporaryFile() as f:
+            f.write(b"".join(lines))
+            f.flush()
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                loaded = list(PersonSerializer.load_ntriples(mm))
+            finally:
+                mm.close()
+
+        self.assertEqual(10, len(loaded))
+        for person in loaded:
+            self.assert_person_equal(people[person.id], person)
+
+    def test_untyped_roots(self):
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://example.com/name")
+
+            class Meta:
+                rdf_subject = "id"
+
+        lines = [
+            "<http://example.com/1> <http://example.com/name> \"One\" .",
+            "<http://example.com/2> <http://example.com/name> \"Two\" .",
+        ]
+        self.assertEqual(["One", "Two"], [m.name for m in ModelSerializer.load_ntriples(lines)])
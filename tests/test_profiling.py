@@ -0,0 +1,50 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from r2dto_rdf import ValidationError
+from r2dto_rdf.context import SerializationContext
+from r2dto_rdf.profiling import Profiler, PHASE_SERIALIZE, PHASE_VALIDATE
+
+from tests.utils import make_order_serializers, make_orders
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_profile(self):
+        for codegen in (False, True):
+            ItemSerializer, OrderSerializer = make_order_serializers(codegen)
+            orders = make_orders(4)
+            expected = set(OrderSerializer.build_graph_many(orders, deterministic=True).graph)
+
+            with OrderSerializer.profile() as profiler:
+                graph = OrderSerializer.build_graph_many(orders, deterministic=True).graph
+                for order in orders:
+                    OrderSerializer(object=order).validate()
+            self.assertIsNone(SerializationContext.profiler)
+            self.assertEqual(expected, set(graph))
+
+            stats = {(e.serializer_class, e.field, e.phase): e for e in profiler.report()}
+            order = stats[(OrderSerializer, None, PHASE_SERIALIZE)]
+            self.assertEqual(4, order.calls)
+            self.assertEqual(len(expected), order.triples)
+            self.assertEqual(12, stats[(ItemSerializer, None, PHASE_SERIALIZE)].calls)
+            self.assertEqual(12, stats[(ItemSerializer, "name", PHASE_SERIALIZE)].triples)
+            self.assertEqual(8, stats[(OrderSerializer, "tags", PHASE_SERIALIZE)].triples)
+            self.assertEqual(4, stats[(OrderSerializer, "count", PHASE_VALIDATE)].calls)
+            self.assertGreaterEqual(order.time, stats[(OrderSerializer, "items", PHASE_SERIALIZE)].time)
+            self.assertIn("OrderSerializer.items", profiler.format_report())
+
+            # Nothing is recorded outside of the block.
+            OrderSerializer(object=orders[0]).build_graph()
+            self.assertEqual(4, profiler.stats[(OrderSerializer, None, PHASE_SERIALIZE)][0])
+
+    def test_profile_keeps_errors(self):
+        _, OrderSerializer = make_order_serializers(False)
+        order = make_orders(1)[0]
+        order.count = -1
+        with OrderSerializer.profile(Profiler()):
+            with self.assertRaises(ValidationError) as cm:
+                OrderSerializer(object=order).validate()
+            with self.assertRaises(ValidationError):
+                OrderSerializer(object=order).validate_and_build_graph()
+        self.assertEqual(["negative"], cm.exception.errors)
@@ -5,6 +5,7 @@ import unittest
 import uuid
 
 import r2dto
+from rdflib import URIRef
 
 from r2dto_rdf import RdfR2DtoSerializer, create_rdf_serializer_from_r2dto_serializer, RdfUuidField
 
@@ -281,3 +282,42 @@ class R2DtoMappingTests(RdflibTestCaseMixin, unittest.TestCase):
         g = s.build_graph()
 
         self.assert_triple(g, m.id, s.namespace_manager.resolve_term("nws:field"), "Some Field")
+
+    def test_generated_serializers_are_reused(self):
+        class Node(object):
+            def __init__(self, name, *children):
+                self.id = "http://api.nickswebsite.net/data#{}".format(name)
+                self.name = name
+                self.children = list(children)
+                self.parent = None
+
+        class NodeSerializer(r2dto.Serializer):
+            name = r2dto.fields.StringField()
+            children = r2dto.fields.ListField(r2dto.fields.ObjectField(None))
+            parent = r2dto.fields.ObjectField(None)
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_prefixes = {
+                    "nws": "http://api.nickswebsite.net/ns/",
+                }
+
+            class Rdf:
+                name = "nws:name"
+                children = "nws:child"
+                parent = "nws:parent"
+
+        # Both fields refer back to NodeSerializer.
+        fields = {field.object_field_name: field for field in NodeSerializer.fields}
+        fields["children"].allowed_types[0].serializer_class = NodeSerializer
+        fields["parent"].serializer_class = NodeSerializer
+
+        RdfNodeSerializer = create_rdf_serializer_from_r2dto_serializer(NodeSerializer)
+        self.assertIs(RdfNodeSerializer, create_rdf_serializer_from_r2dto_serializer(NodeSerializer))
+
+        tree = Node("root", Node("a", Node("b")), Node("c"))
+        s = RdfNodeSerializer(object=tree)
+        s.validate()
+        g = s.build_graph()
+        self.assertEqual(4, len(set(g.objects(None, URIRef("http://api.nickswebsite.net/ns/name")))))
+        self.assertEqual(3, len(list(g.objects(None, URIRef("http://api.nickswebsite.net/ns/child")))))
@@ -1,12 +1,19 @@
 from __future__ import unicode_literals
 
+import io
+import subprocess
+import sys
 import unittest
+import warnings
 
-from rdflib import URIRef, RDF
+from rdflib import Graph, URIRef, RDF
 
-from r2dto_rdf import RdfSerializer, RdfIriField, RdfStringField, RdfObjectField, RdfSetField
+from r2dto_rdf import RdfSerializer, RdfIriField, RdfStringField, RdfObjectField, RdfSetField, RdfIntegerField, \
+    RdfFloatField, ValidationError
+from r2dto_rdf.fields import SerializerReference
+from r2dto_rdf.namespaces import registry as namespace_registry
 
-from tests.utils import RdflibTestCaseMixin, get_triples
+from tests.utils import Model, RdflibTestCaseMixin, get_triples, make_order_serializers, make_orders
 
 
 class SerializerTests(RdflibTestCaseMixin, unittest.TestCase):
@@ -267,3 +274,431 @@ class SerializerTests(RdflibTestCaseMixin, unittest.TestCase):
         self.assertEqual(m.prop, prop_triples[0][-1].toPython())
         none_triples = get_triples(g, m.id, "http://api.nickswebsite.net/ns/none", None)
         self.assertEqual(0, len(none_triples))
+
+    def test_plan_is_compiled_once_per_class(self):
+        class ModelSerializer(RdfSerializer):
+            field = RdfStringField(predicate="nws:field", datatype="nws:Stringish")
+            link = RdfIriField(predicate="nws:link")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_type = "nws:Type"
+                rdf_prefixes = {
+                    "nws": "http://api.nickswebsite.net/ns/",
+                }
+
+        plan = ModelSerializer.plan
+        self.assertIs(ModelSerializer.options.rdf_subject_field, plan.subject_field)
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/Type"), plan.rdf_type)
+
+        field_plans = {field_plan.name: field_plan for field_plan in plan.fields}
+        self.assertEqual({"field", "link"}, set(field_plans))
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/field"), field_plans["field"].predicate)
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/Stringish"), field_plans["field"].datatype)
+        self.assertEqual("literal", field_plans["field"].kind)
+        self.assertEqual("iri", field_plans["link"].kind)
+
+    def test_set_of_iris(self):
+        class Model(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#10"
+                self.links = ["http://api.nickswebsite.net/data#11", "http://api.nickswebsite.net/data#12"]
+
+        class ModelSerializer(RdfSerializer):
+            links = RdfSetField(RdfIriField(), predicate="http://api.nickswebsite.net/ns/link")
+
+            class Meta:
+                rdf_subject = "id"
+
+        m = Model()
+        g = ModelSerializer(object=m).build_graph()
+        self.assert_triple(g, m.id, "http://api.nickswebsite.net/ns/link", URIRef(m.links[0]))
+        self.assert_triple(g, m.id, "http://api.nickswebsite.net/ns/link", URIRef(m.links[1]))
+
+    def test_iter_triples_is_depth_first(self):
+        class Leaf(object):
+            def __init__(self, value):
+                self.value = value
+
+        class Branch(object):
+            def __init__(self):
+                self.leaves = [Leaf("One"), Leaf("Two")]
+                self.empty = Leaf(None)
+
+        class Model(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#13"
+                self.branch = Branch()
+
+        class LeafSerializer(RdfSerializer):
+            value = RdfStringField(predicate="nws:value")
+
+            class Meta:
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class BranchSerializer(RdfSerializer):
+            leaves = RdfSetField(RdfObjectField(LeafSerializer), predicate="nws:leaf")
+            empty = RdfObjectField(LeafSerializer, predicate="nws:empty")
+
+            class Meta:
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class ModelSerializer(RdfSerializer):
+            branch = RdfObjectField(BranchSerializer, predicate="nws:branch")
+
+            class Meta:
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+                rdf_subject = "id"
+
+        m = Model()
+        triples = list(ModelSerializer(object=m).iter_triples())
+
+        self.assertEqual(5, len(triples))
+        self.assertEqual(URIRef(m.id), triples[0][0])
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/branch"), triples[0][1])
+        branch_node = triples[0][2]
+        for i in (1, 3):
+            self.assertEqual((branch_node, URIRef("http://api.nickswebsite.net/ns/leaf")), triples[i][:2])
+            self.assertEqual(triples[i][2], triples[i + 1][0])
+        self.assertEqual({"One", "Two"}, {triples[2][2].value, triples[4][2].value})
+
+        g = ModelSerializer(object=m).build_graph()
+        self.assertEqual(5, len(g))
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/"), dict(g.namespaces())["nws"])
+
+    def test_build_graph_many(self):
+        class Model(object):
+            def __init__(self, i):
+                self.id = "http://api.nickswebsite.net/data#{}".format(i)
+                self.field = "Field {}".format(i)
+
+        class ModelSerializer(RdfSerializer):
+            field = RdfStringField(predicate="nws:field")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_type = "nws:Type"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        models = [Model(i) for i in range(25)]
+        result = ModelSerializer.build_graph_many(iter(models), batch_size=7)
+
+        self.assertEqual(25, result.objects)
+        self.assertEqual(50, result.triples)
+        self.assertEqual(50, len(result.graph))
+        for m in models:
+            self.assert_triple(result.graph, m.id, "http://api.nickswebsite.net/ns/field", m.field)
+        self.assertEqual(URIRef("http://api.nickswebsite.net/ns/"), dict(result.graph.namespaces())["nws"])
+
+        store = Graph().store
+        result = ModelSerializer.build_graph_many(models[:3], graph=store)
+        self.assertIs(store, result.graph.store)
+        self.assertEqual(6, len(result.graph))
+
+    def test_validate(self):
+        def positive(value):
+            if value <= 0:
+                raise ValidationError("count must be positive")
+
+        class Model(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#14"
+                self.name = "Name"
+                self.count = 3
+
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name", required=True)
+            count = RdfIntegerField(predicate="http://api.nickswebsite.net/ns/count", validators=positive)
+            ratio = RdfFloatField(predicate="http://api.nickswebsite.net/ns/ratio", required=True)
+
+            class Meta:
+                rdf_subject = "id"
+
+        plan = {validation_plan.name: validation_plan for validation_plan in ModelSerializer.plan.validation}
+        self.assertEqual((str,), plan["name"].basetypes)
+        self.assertIsNone(plan["name"].validate)
+        self.assertEqual((positive,), plan["count"].validators)
+        self.assertIsNotNone(plan["id"].validate)
+
+        m = Model()
+        m.ratio = 0.5
+        ModelSerializer(object=m).validate()
+
+        m.ratio = None
+        m.name = 3
+        m.count = -1
+        del m.id
+        with self.assertRaises(ValidationError) as ctx:
+            ModelSerializer(object=m).validate()
+        self.assertEqual({
+            "Field id is missing from object.",
+            "Field ratio cannot be None.",
+            "name must be a (<class 'str'>,).  Got <class 'int'>.",
+            "count must be positive",
+        }, set(ctx.exception.errors))
+
+    def test_validate_and_build_graph(self):
+        class Tag(object):
+            def __init__(self, label):
+                self.label = label
+
+        class Model(object):
+            def __init__(self, labels):
+                self.id = "http://api.nickswebsite.net/data#15"
+                self.name = "Name"
+                self.tags = (Tag(label) for label in labels)
+
+        class TagSerializer(RdfSerializer):
+            label = RdfStringField(predicate="nws:label", required=True)
+
+            class Meta:
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="nws:name", required=True)
+            tags = RdfSetField(RdfObjectField(TagSerializer), predicate="nws:tag")
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+        # The tags are a generator, so they can only be walked once.
+        g = ModelSerializer(object=Model(["a", "b"])).validate_and_build_graph()
+        self.assertEqual(5, len(g))
+        self.assert_triple(g, "http://api.nickswebsite.net/data#15", "http://api.nickswebsite.net/ns/name", "Name")
+        self.assertEqual({"a", "b"}, {str(o) for o in g.objects(None, URIRef("http://api.nickswebsite.net/ns/label"))})
+
+        m = Model(["a", 2])
+        m.name = None
+        with self.assertRaises(ValidationError) as ctx:
+            ModelSerializer(object=m).iter_validated_triples()
+        self.assertEqual([
+            "Field name cannot be None.",
+            "{}.tags[1] error processing".format(ModelSerializer),
+            "label must be a (<class 'str'>,).  Got <class 'int'>.",
+        ], ctx.exception.errors)
+
+    def test_namespace_registry(self):
+        class FirstSerializer(RdfSerializer):
+            field = RdfStringField(predicate="reg:field")
+
+            class Meta:
+                rdf_prefixes = {"reg": "http://api.nickswebsite.net/registry/"}
+
+        class SecondSerializer(RdfSerializer):
+            other = RdfStringField(predicate="reg:field")
+
+            class Meta:
+                rdf_prefixes = {"reg": "http://api.nickswebsite.net/registry/"}
+
+        self.assertIs(FirstSerializer.plan.fields[0].predicate, SecondSerializer.plan.fields[0].predicate)
+        self.assertIs(FirstSerializer.namespace_manager["reg"], SecondSerializer.namespace_manager["reg"])
+        g = FirstSerializer.namespace_manager.new_graph()
+        self.assertEqual(URIRef("http://api.nickswebsite.net/registry/"), dict(g.namespaces())["reg"])
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+
+            class ConflictingSerializer(RdfSerializer):
+                field = RdfStringField(predicate="reg:field")
+
+                class Meta:
+                    rdf_prefixes = {"reg": "http://api.nickswebsite.net/other/"}
+
+        self.assertEqual(1, len(caught))
+        self.assertIn("Prefix reg is bound to http://api.nickswebsite.net/other/", str(caught[0].message))
+        # Each class still resolves against its own prefixes.
+        self.assertEqual(URIRef("http://api.nickswebsite.net/other/field"),
+                         ConflictingSerializer.plan.fields[0].predicate)
+
+        namespace_registry.strict = True
+        try:
+            with self.assertRaises(ValueError):
+                class StrictSerializer(RdfSerializer):
+                    field = RdfStringField(predicate="reg:field")
+
+                    class Meta:
+                        rdf_prefixes = {"reg": "http://api.nickswebsite.net/other/"}
+        finally:
+            namespace_registry.strict = False
+
+    def test_nested_objects_are_serialized_without_instances(self):
+        created = []
+
+        class Item(object):
+            def __init__(self, i):
+                self.sku = "SKU-{}".format(i)
+
+        class Order(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#16"
+                self.items = [Item(i) for i in range(3)]
+
+        class ItemSerializer(RdfSerializer):
+            sku = RdfStringField(predicate="http://api.nickswebsite.net/ns/sku", required=True)
+
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                super(ItemSerializer, self).__init__(*args, **kwargs)
+
+        class OrderSerializer(RdfSerializer):
+            items = RdfSetField(RdfObjectField(ItemSerializer), predicate="http://api.nickswebsite.net/ns/item")
+
+            class Meta:
+                rdf_subject = "id"
+
+        order = Order()
+        OrderSerializer(object=order).validate()
+        g = OrderSerializer(object=order).validate_and_build_graph()
+        self.assertEqual(6, len(g))
+        self.assertEqual([], created)
+
+        triples = []
+        self.assertEqual(1, ItemSerializer.emit(order.items[0], "http://api.nickswebsite.net/data#17",
+                                                lambda s, p, o: triples.append((s, p, o))))
+        self.assertEqual([], created)
+        self.assert_triple(triples, "http://api.nickswebsite.net/data#17", "http://api.nickswebsite.net/ns/sku",
+                           "SKU-0")
+
+        order.items[1].sku = 1
+        with self.assertRaises(ValidationError):
+            OrderSerializer(object=order).validate()
+
+        # Serializers that depend on their instance still get one.
+        class NamedItemSerializer(ItemSerializer):
+            sku = RdfStringField(predicate="http://api.nickswebsite.net/ns/sku")
+
+            def get_subject_node(self, subject=None, context=None):
+                return URIRef("http://api.nickswebsite.net/items/{}".format(self.object.sku))
+
+        order.items[1].sku = "SKU-1"
+        triples = list(NamedItemSerializer.iter_object_triples(order.items[1]))
+        self.assertEqual(1, len(created))
+        self.assert_triple(triples, "http://api.nickswebsite.net/items/SKU-1", "http://api.nickswebsite.net/ns/sku",
+                           "SKU-1")
+
+    def test_generated_methods(self):
+        _, generated = make_order_serializers(True)
+        _, interpreted = make_order_serializers(False)
+        self.assertIn("getattr(obj, 'homepage', None)", generated.generated_source)
+        self.assertFalse(hasattr(interpreted, "generated_source"))
+
+        models = make_orders(5)
+        self.assertEqual(set(interpreted.build_graph_many(models, deterministic=True).graph),
+                         set(generated.build_graph_many(models, deterministic=True).graph))
+
+        models[1].name = None
+        models[1].count = 1.5
+        del models[2].id
+        for m in models:
+            errors = []
+            for serializer_class in (interpreted, generated):
+                try:
+                    serializer_class(object=m).validate()
+                    errors.append(None)
+                except ValidationError as ex:
+                    errors.append(ex.errors)
+            self.assertEqual(errors[0], errors[1])
+        with self.assertRaises(ValidationError):
+            generated(object=models[1]).validate_and_build_graph()
+
+        # A subclass has a plan of its own, so it doesn't use the generated methods of its parent.
+        class SubSerializer(generated):
+            other = RdfStringField(predicate="http://api.nickswebsite.net/ns/other")
+
+        models[0].other = "Other"
+        g = SubSerializer(object=models[0]).build_graph()
+        self.assertEqual(1, len(list(g.objects(None, URIRef("http://api.nickswebsite.net/ns/other")))))
+
+    def test_deferred_configuration(self):
+        script = "\n".join([
+            "import sys",
+            "import r2dto_rdf",
+            "from r2dto_rdf import RdfSerializer, RdfStringField",
+            "class ModelSerializer(RdfSerializer):",
+            "    name = RdfStringField(predicate='nws:name')",
+            "    class Meta:",
+            "        rdf_subject = 'id'",
+            "        rdf_prefixes = {'nws': 'http://api.nickswebsite.net/ns/'}",
+            "        rdf_defer = True",
+            "print('rdflib' in sys.modules)",
+            "class Model(object):",
+            "    id = 'http://api.nickswebsite.net/data#1'",
+            "    name = 'Name'",
+            "print(len(ModelSerializer(object=Model()).build_graph()))",
+        ])
+        output = subprocess.check_output([sys.executable, "-c", script]).decode("utf-8").split()
+        self.assertEqual(["False", "1"], output)
+
+        # Configuration errors show up the first time the class is used.
+        class BadSerializer(RdfSerializer):
+            name = RdfStringField()
+
+            class Meta:
+                rdf_subject = "id"
+                rdf_defer = True
+
+        with self.assertRaises(ValueError):
+            BadSerializer.plan
+
+    def test_shared_and_cyclic_objects(self):
+        class PersonSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name")
+            friend = RdfObjectField(SerializerReference(lambda: PersonSerializer),
+                                    predicate="http://api.nickswebsite.net/ns/friend")
+
+        class TeamSerializer(RdfSerializer):
+            lead = RdfObjectField(PersonSerializer, predicate="http://api.nickswebsite.net/ns/lead")
+            members = RdfSetField(RdfObjectField(PersonSerializer), predicate="http://api.nickswebsite.net/ns/member")
+            parent = RdfObjectField(SerializerReference(lambda: TeamSerializer),
+                                    predicate="http://api.nickswebsite.net/ns/parent")
+
+            class Meta:
+                rdf_subject = "id"
+
+        alice = Model(name="Alice")
+        bob = Model(name="Bob", friend=alice)
+        alice.friend = bob
+        team = Model(id="http://api.nickswebsite.net/data#team", lead=alice, members=[alice, bob])
+        team.parent = team
+
+        g = TeamSerializer(object=team).validate_and_build_graph()
+        ns = "http://api.nickswebsite.net/ns/"
+        lead = g.value(URIRef(team.id), URIRef(ns + "lead"))
+        members = set(g.objects(URIRef(team.id), URIRef(ns + "member")))
+        self.assertEqual({lead, g.value(lead, URIRef(ns + "friend"))}, members)
+        self.assertEqual(lead, g.value(g.value(lead, URIRef(ns + "friend")), URIRef(ns + "friend")))
+        self.assertEqual(URIRef(team.id), g.value(URIRef(team.id), URIRef(ns + "parent")))
+        self.assertEqual(2, len(list(g.triples((None, URIRef(ns + "name"), None)))))
+
+        TeamSerializer(object=team).validate()
+        out = io.BytesIO()
+        TeamSerializer.write_turtle([team], out)
+        self.assertEqual(len(g), len(Graph().parse(data=out.getvalue().decode("utf-8"), format="turtle")))
+
+        # A collapsed object shared by several subjects is rendered onto each of them.
+        class AuditSerializer(RdfSerializer):
+            by = RdfStringField(predicate="http://api.nickswebsite.net/ns/by")
+
+        class ChildSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name")
+            audit = RdfObjectField(AuditSerializer, collapse=True)
+
+        class ParentSerializer(RdfSerializer):
+            children = RdfSetField(RdfObjectField(ChildSerializer), predicate="http://api.nickswebsite.net/ns/child")
+
+            class Meta:
+                rdf_subject = "id"
+
+        audit = Model(by="bob")
+        parent = Model(id="http://api.nickswebsite.net/data#parent",
+                       children=[Model(name="One", audit=audit), Model(name="Two", audit=audit)])
+        g = ParentSerializer(object=parent).build_graph()
+        children = set(g.objects(URIRef(parent.id), URIRef(ns + "child")))
+        self.assertEqual(2, len(children))
+        for child in children:
+            self.assertEqual("bob", str(g.value(child, URIRef(ns + "by"))))
+
+        # Each top level object of a bulk run is rendered on its own.
+        g = TeamSerializer.build_graph_many([team, team], deterministic=True).graph
+        self.assertEqual(4, len(list(g.triples((None, URIRef(ns + "name"), None)))))
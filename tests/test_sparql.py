@@ -0,0 +1,142 @@
+from __future__ import unicode_literals
+
+import copy
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from rdflib import Graph, ConjunctiveGraph, URIRef, BNode, Literal
+from rdflib.compare import isomorphic
+
+from r2dto_rdf.writers import SparqlUpdateWriter, post_sparql_updates
+
+from tests.test_writers import Person, PersonSerializer
+from tests.utils import make_skolemized_serializer
+
+SKOLEM_BASE = "http://api.nickswebsite.net/.well-known/genid/"
+
+
+class SparqlEndpoint(object):
+    """
+    A stand-in SPARQL Update endpoint that applies whatever is POSTed to it to an rdflib ConjunctiveGraph.
+    """
+    def __init__(self):
+        self.store = ConjunctiveGraph()
+        self.bodies = []
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                endpoint.bodies.append(body)
+                endpoint.store.update(body)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}/update".format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SparqlUpdateTests(unittest.TestCase):
+    def setUp(self):
+        self.endpoint = SparqlEndpoint()
+
+    def tearDown(self):
+        self.endpoint.close()
+
+    def test_inserts(self):
+        people = [Person(i) for i in range(10)]
+        bodies = list(PersonSerializer.iter_sparql_inserts(people, max_triples=20))
+        # Eight triples per person, and people aren't split between bodies.
+        self.assertEqual(5, len(bodies))
+        for body in bodies:
+            self.assertTrue(body.startswith("PREFIX nws: <http://api.nickswebsite.net/ns/>\nINSERT DATA {\n"))
+            self.assertEqual(1, body.count("PREFIX"))
+            self.assertNotIn("DELETE DATA", body)
+
+        self.assertEqual(5, post_sparql_updates(self.endpoint.url, bodies))
+        expected = PersonSerializer.build_graph_many(people).graph
+        stored = Graph()
+        for triple in self.endpoint.store.triples((None, None, None)):
+            stored.add(triple)
+        self.assertTrue(isomorphic(expected, stored))
+
+    def test_skolemized_inserts(self):
+        HashedPersonSerializer = make_skolemized_serializer(True)
+        people = [Person(1), Person(1), Person(1)]
+        for i, person in enumerate(people):
+            person.id = "http://api.nickswebsite.net/data#{}".format(i)
+        bodies = list(HashedPersonSerializer.iter_sparql_inserts(people, max_triples=2))
+        self.assertEqual(3, len(bodies))
+        # Blank nodes only mean the same node within one request, so each body needs the whole address.
+        for body in bodies:
+            self.assertIn("nws:street", body)
+        post_sparql_updates(self.endpoint.url, bodies)
+        address = URIRef("http://api.nickswebsite.net/ns/address")
+        street = URIRef("http://api.nickswebsite.net/ns/street")
+        for person in people:
+            node = self.endpoint.store.value(URIRef(person.id), address)
+            self.assertEqual("1 Main St", str(self.endpoint.store.value(node, street)))
+
+    def test_max_bytes(self):
+        people = [Person(i) for i in range(10)]
+        bodies = list(PersonSerializer.iter_sparql_inserts(people, max_bytes=1500))
+        self.assertGreater(len(bodies), 1)
+        for body in bodies:
+            self.assertLessEqual(len(body.encode("utf-8")), 1500)
+
+        # A group bigger than the limit gets a body of its own.
+        bodies = list(PersonSerializer.iter_sparql_inserts(people[:3], max_bytes=10))
+        self.assertEqual(3, len(bodies))
+
+    def test_named_graph_updates(self):
+        graph_name = "http://api.nickswebsite.net/graphs/people"
+        versions = [[Person(i) for i in range(4)]]
+        new = copy.deepcopy(versions[0])
+        new[0].name = "Renamed"
+        new[1].address.street = "Elm St"
+        new[2].nicknames = ["Only"]
+        versions.append(new)
+
+        diffs = [PersonSerializer.diff(None, p, skolemize=SKOLEM_BASE) for p in versions[0]]
+        diffs.extend(PersonSerializer.diff(old, p, skolemize=SKOLEM_BASE) for old, p in zip(*versions))
+        diffs.append(PersonSerializer.diff(versions[1][3], None, skolemize=SKOLEM_BASE))
+        bodies = list(PersonSerializer.iter_sparql_updates(diffs, graph_name=graph_name, max_triples=10))
+        self.assertIn("DELETE DATA {\n    GRAPH <http://api.nickswebsite.net/graphs/people> {\n", "".join(bodies))
+        post_sparql_updates(self.endpoint.url, bodies)
+
+        expected = Graph()
+        for p in versions[1][:3]:
+            for triple in PersonSerializer.diff(None, p, skolemize=SKOLEM_BASE).added:
+                expected.add(triple)
+        stored = self.endpoint.store.get_context(URIRef(graph_name))
+        self.assertEqual(set(expected), set(stored))
+        self.assertEqual(len(stored), len(self.endpoint.store))
+
+    def test_last_operation_wins(self):
+        s, p = URIRef("http://api.nickswebsite.net/data#1"), URIRef("http://api.nickswebsite.net/ns/name")
+        one, two = (s, p, Literal("One")), (s, p, Literal("Two"))
+        writer = SparqlUpdateWriter()
+        writer.write_group(inserts=[one])
+        writer.write_group(inserts=[two], deletes=[one])
+        writer.write_group(inserts=[one], deletes=[two])
+        post_sparql_updates(self.endpoint.url, [writer.flush()])
+        self.assertEqual({one}, set(self.endpoint.store.triples((None, None, None))))
+        self.assertIsNone(writer.flush())
+
+        with self.assertRaises(ValueError):
+            writer.write_group(deletes=[(s, p, BNode())])
@@ -0,0 +1,43 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from rdflib import URIRef, Literal, XSD
+
+from r2dto_rdf import TermCache
+
+from tests.test_writers import Person, PersonSerializer
+
+
+class TermCacheTests(unittest.TestCase):
+    def test_literals_are_shared(self):
+        terms = TermCache(maxsize=3)
+        self.assertIs(terms.literal("a"), terms.literal("a"))
+        self.assertEqual(Literal("a", "en"), terms.literal("a", "en"))
+        self.assertEqual(Literal(1, datatype=XSD.integer), terms.literal(1, datatype=XSD.integer))
+        # True == 1, but they aren't the same literal.
+        self.assertEqual(Literal(True, datatype=XSD.boolean), terms.literal(True, datatype=XSD.boolean))
+        self.assertEqual((1, 4, 3, 3), tuple(terms.info()))
+
+        # "a" was the least recently used, so it was evicted.
+        self.assertIsInstance(terms.iri("http://api.nickswebsite.net/ns/"), URIRef)
+        terms.literal("a")
+        self.assertEqual((1, 6, 3, 3), tuple(terms.info()))
+
+        terms.clear()
+        self.assertEqual((0, 0, 3, 0), tuple(terms.info()))
+
+    def test_build_graph_many_with_terms(self):
+        people = [Person(i) for i in range(10)]
+        for person in people:
+            person.homepage = "http://api.nickswebsite.net/people/"
+        terms = TermCache()
+        g = PersonSerializer.build_graph_many(people, terms=terms).graph
+
+        self.assertEqual(len(PersonSerializer.build_graph_many(people).graph), len(g))
+        homepages = list(g.objects(None, URIRef("http://api.nickswebsite.net/ns/homepage")))
+        self.assertEqual(len(people), len(homepages))
+        self.assertEqual(1, len({id(homepage) for homepage in homepages}))
+        info = terms.info()
+        self.assertEqual(9, info.hits)
+        self.assertEqual(len(people) * 6 - 9, info.misses)
@@ -0,0 +1,252 @@
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from rdflib import Graph, Dataset, URIRef, BNode, Literal
+from rdflib.compare import isomorphic
+
+from r2dto_rdf import RdfSerializer, RdfIriField, RdfStringField, RdfIntegerField, RdfObjectField, RdfSetField
+from r2dto_rdf.writers import TurtleWriter
+
+from tests.utils import RdflibTestCaseMixin, make_skolemized_serializer
+
+
+class Address(object):
+    def __init__(self, street):
+        self.street = street
+
+
+class Person(object):
+    def __init__(self, i):
+        self.id = "http://api.nickswebsite.net/data#{}".format(i)
+        self.name = "Person \"{}\"\n\u2012 \\".format(i)
+        self.age = i
+        self.nicknames = ["Nick {}".format(i), "N{}".format(i)]
+        self.address = Address("{} Main St".format(i))
+        self.homepage = "http://api.nickswebsite.net/people/{}".format(i)
+
+
+class AddressSerializer(RdfSerializer):
+    street = RdfStringField(predicate="nws:street", language="en")
+
+    class Meta:
+        rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+
+class PersonSerializer(RdfSerializer):
+    name = RdfStringField(predicate="nws:name")
+    age = RdfIntegerField(predicate="nws:age")
+    nicknames = RdfSetField(RdfStringField(), predicate="nws:nickname")
+    address = RdfObjectField(AddressSerializer, predicate="nws:address")
+    homepage = RdfIriField(predicate="nws:homepage")
+
+    class Meta:
+        rdf_subject = "id"
+        rdf_type = "nws:Person"
+        rdf_prefixes = {"nws": "http://api.nickswebsite.net/ns/"}
+
+
+class WriterTests(RdflibTestCaseMixin, unittest.TestCase):
+    def test_write_ntriples(self):
+        people = [Person(i) for i in range(20)]
+        out = io.BytesIO()
+        count = PersonSerializer.write_ntriples(iter(people), out, buffer_size=100)
+
+        expected = PersonSerializer.build_graph_many(people).graph
+        self.assertEqual(len(expected), count)
+
+        g = Graph()
+        g.parse(data=out.getvalue().decode("utf-8"), format="nt")
+        self.assertTrue(isomorphic(expected, g))
+
+    def test_build_many_parallel(self):
+        people = [Person(i) for i in range(25)]
+        out = io.BytesIO()
+        out.writelines(PersonSerializer.build_many_parallel(iter(people), workers=2, chunk_size=4))
+
+        g = Graph()
+        g.parse(data=out.getvalue().decode("utf-8"), format="nt")
+        self.assertTrue(isomorphic(PersonSerializer.build_graph_many(people).graph, g))
+        # The chunks come back in order.
+        subjects = []
+        for line in out.getvalue().splitlines():
+            subject = line.split(b" ", 1)[0]
+            if subject.startswith(b"<") and subject not in subjects:
+                subjects.append(subject)
+        self.assertEqual(["<{}>".format(p.id).encode("utf-8") for p in people], subjects)
+
+        graph_name = "http://api.nickswebsite.net/graphs/people"
+        chunks = list(PersonSerializer.build_many_parallel(people[:3], workers=1, format="nq", graph_name=graph_name))
+        self.assertEqual(1, len(chunks))
+        ds = Dataset()
+        ds.parse(data=chunks[0].decode("utf-8"), format="nquads")
+        self.assertEqual(24, len(ds.graph(URIRef(graph_name))))
+
+        with self.assertRaises(ValueError):
+            list(PersonSerializer.build_many_parallel(people, format="nq"))
+
+    def test_deterministic_blank_nodes(self):
+        people = [Person(i) for i in range(5)]
+        outputs = []
+        for _ in range(2):
+            out = io.BytesIO()
+            PersonSerializer.write_ntriples(people, out, deterministic=True)
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn(b"_:b_4 ", outputs[0])
+
+        # Without it, each run gets its own prefix.
+        first, second = [PersonSerializer.build_graph_many(people[:1]).graph for _ in range(2)]
+        self.assertTrue(isomorphic(first, second))
+        first_blank_nodes = {n for n in first.all_nodes() if isinstance(n, BNode)}
+        second_blank_nodes = {n for n in second.all_nodes() if isinstance(n, BNode)}
+        self.assertEqual(1, len(first_blank_nodes))
+        self.assertFalse(first_blank_nodes & second_blank_nodes)
+
+        chunks = [b"".join(PersonSerializer.build_many_parallel(people, workers=workers, chunk_size=2,
+                                                                deterministic=True))
+                  for workers in (1, 2)]
+        self.assertEqual(chunks[0], chunks[1])
+        self.assertIn(b"_:b2_0 ", chunks[0])
+
+    def test_skolemized_nested_objects(self):
+        HashedPersonSerializer = make_skolemized_serializer(True)
+        people = [Person(i) for i in range(4)]
+        people[3].address = Address("0 Main St")
+        out = io.BytesIO()
+        count = HashedPersonSerializer.write_ntriples(people, out)
+        # One street triple per distinct address.
+        self.assertEqual(4 * 2 + 3, count)
+
+        g = Graph()
+        g.parse(data=out.getvalue().decode("utf-8"), format="nt")
+        address = URIRef("http://api.nickswebsite.net/ns/address")
+        self.assertEqual(g.value(URIRef(people[0].id), address), g.value(URIRef(people[3].id), address))
+        self.assertNotEqual(g.value(URIRef(people[0].id), address), g.value(URIRef(people[1].id), address))
+
+        # The names only depend on the content, so they're the same from one run to the next.
+        again = io.BytesIO()
+        HashedPersonSerializer.write_ntriples(people, again)
+        self.assertEqual(out.getvalue(), again.getvalue())
+
+        out = io.BytesIO()
+        HashedPersonSerializer.write_turtle(people, out)
+        turtle = Graph()
+        turtle.parse(data=out.getvalue().decode("utf-8"), format="turtle")
+        self.assertTrue(isomorphic(g, turtle))
+
+        HashedPersonSerializer = make_skolemized_serializer("http://api.nickswebsite.net/.well-known/genid/")
+        g = HashedPersonSerializer(object=people[0]).build_graph()
+        self.assertTrue(g.value(URIRef(people[0].id), address).startswith(
+            "http://api.nickswebsite.net/.well-known/genid/"))
+
+    def test_skolemized_objects_with_nested_values(self):
+        class GeoSerializer(RdfSerializer):
+            lat = RdfStringField(predicate="http://api.nickswebsite.net/ns/lat")
+
+        class CitySerializer(RdfSerializer):
+            city = RdfStringField(predicate="http://api.nickswebsite.net/ns/city")
+            geo = RdfObjectField(GeoSerializer, predicate="http://api.nickswebsite.net/ns/geo")
+
+            class Meta:
+                rdf_skolemize = True
+
+        class PlaceSerializer(RdfSerializer):
+            address = RdfObjectField(CitySerializer, predicate="http://api.nickswebsite.net/ns/address")
+
+            class Meta:
+                rdf_subject = "id"
+
+        places = [Person(i) for i in range(3)]
+        for place in places:
+            place.address = Address("")
+            place.address.city = "Paris"
+            place.address.geo = Address("")
+            place.address.geo.lat = "48.85"
+        g = PlaceSerializer.build_graph_many(places).graph
+        address = URIRef("http://api.nickswebsite.net/ns/address")
+        self.assertEqual(1, len({g.value(URIRef(place.id), address) for place in places}))
+        self.assertEqual(3 + 3, len(g))
+
+    def test_write_ntriples_text_file(self):
+        out = io.StringIO()
+        PersonSerializer.write_ntriples([Person(1)], out)
+
+        g = Graph()
+        g.parse(data=out.getvalue(), format="nt")
+        self.assert_triple(g, "http://api.nickswebsite.net/data#1", "http://api.nickswebsite.net/ns/age", 1)
+
+    def test_write_nquads(self):
+        graph_name = "http://api.nickswebsite.net/graphs/people"
+        out = io.BytesIO()
+        PersonSerializer.write_ntriples([Person(1), Person(2)], out, graph_name=graph_name)
+
+        ds = Dataset()
+        ds.parse(data=out.getvalue().decode("utf-8"), format="nquads")
+        g = ds.graph(URIRef(graph_name))
+        self.assertEqual(16, len(g))
+        self.assert_triple(g, "http://api.nickswebsite.net/data#2", "http://api.nickswebsite.net/ns/nickname", "N2")
+
+    def test_anonymous_subjects(self):
+        class ModelSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name")
+
+        out = io.BytesIO()
+        ModelSerializer.write_ntriples([Person(1)], out)
+        subject, predicate, _ = out.getvalue().decode("utf-8").split(" ", 2)
+        self.assertTrue(subject.startswith("_:"))
+        self.assertTrue(subject[2:].replace("_", "").isalnum())
+        self.assertEqual("<http://api.nickswebsite.net/ns/name>", predicate)
+
+    def test_write_turtle(self):
+        people = [Person(i) for i in range(5)]
+        out = io.BytesIO()
+        count = PersonSerializer.write_turtle(people, out, buffer_size=10)
+
+        expected = PersonSerializer.build_graph_many(people).graph
+        self.assertEqual(len(expected), count)
+
+        text = out.getvalue().decode("utf-8")
+        self.assertEqual(1, text.count("@prefix nws: <http://api.nickswebsite.net/ns/> ."))
+        self.assertIn("<http://api.nickswebsite.net/data#3> a nws:Person ;", text)
+        self.assertIn("nws:age 3 ;", text)
+        self.assertIn("nws:address [", text)
+        self.assertNotIn("_:", text)
+
+        g = Graph()
+        g.parse(data=text, format="turtle")
+        self.assertTrue(isomorphic(expected, g))
+
+    def test_turtle_short_literals(self):
+        writer = TurtleWriter(io.BytesIO())
+        self.assertEqual("true", writer.format_term(Literal(True)))
+        self.assertEqual("false", writer.format_term(Literal(False)))
+        self.assertEqual("-3", writer.format_term(Literal(-3)))
+
+    def test_write_turtle_shared_blank_nodes(self):
+        class Tag(object):
+            def __init__(self, name):
+                self.name = name
+
+        class TagSerializer(RdfSerializer):
+            name = RdfStringField(predicate="http://api.nickswebsite.net/ns/name")
+
+        class Model(object):
+            def __init__(self):
+                self.id = "http://api.nickswebsite.net/data#1"
+                self.tags = [Tag("a"), Tag("b")]
+
+        class ModelSerializer(RdfSerializer):
+            tags = RdfSetField(RdfObjectField(TagSerializer), predicate="http://api.nickswebsite.net/ns/tag",
+                               collapse=False)
+
+            class Meta:
+                rdf_subject = "id"
+
+        out = io.StringIO()
+        ModelSerializer.write_turtle([Model()], out)
+
+        g = Graph()
+        g.parse(data=out.getvalue(), format="turtle")
+        self.assertTrue(isomorphic(ModelSerializer(object=Model()).build_graph(), g))
@@ -3,6 +3,9 @@ from __future__ import unicode_literals
 from rdflib import BNode, URIRef, Literal
 from rdflib.term import Identifier
 
+from r2dto_rdf import RdfSerializer, RdfStringField, RdfIntegerField, RdfIriField, RdfObjectField, RdfSetField, \
+    ValidationError
+
 from pprint import pprint
 
 
@@ -12,6 +15,73 @@ except NameError:
     basestring = str
 
 
+NWS = "http://api.nickswebsite.net/ns/"
+
+
+class Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def make_order_serializers(codegen=False):
+    """
+    Returns a new (ItemSerializer, OrderSerializer) pair, with generated methods if ``codegen`` is True.
+    """
+    class ItemSerializer(RdfSerializer):
+        name = RdfStringField(predicate="nws:name")
+
+        class Meta:
+            rdf_prefixes = {"nws": NWS}
+            rdf_codegen = codegen
+
+    def positive(value):
+        if value < 0:
+            raise ValidationError(["negative"])
+
+    class OrderSerializer(RdfSerializer):
+        name = RdfStringField(predicate="nws:name", required=True, language="en")
+        count = RdfIntegerField(predicate="nws:count", validators=[positive])
+        homepage = RdfIriField(predicate="nws:homepage")
+        items = RdfSetField(RdfObjectField(ItemSerializer), predicate="nws:item")
+        tags = RdfSetField(RdfStringField(), predicate="nws:tag")
+
+        class Meta:
+            rdf_subject = "id"
+            rdf_type = "nws:Order"
+            rdf_prefixes = {"nws": NWS}
+            rdf_codegen = codegen
+
+    return ItemSerializer, OrderSerializer
+
+
+def make_orders(n, items=3):
+    return [Model(id="http://api.nickswebsite.net/data#{}".format(i), name="Order {}".format(i), count=i,
+                  homepage="http://api.nickswebsite.net/{}".format(i) if i % 2 else None, tags=["a", "b"],
+                  items=[Model(name="Item {}".format(j)) for j in range(items)]) for i in range(n)]
+
+
+def make_skolemized_serializer(skolemize):
+    """
+    Returns a new person serializer whose addresses are skolemized with ``skolemize``.
+    """
+    class HashedAddressSerializer(RdfSerializer):
+        street = RdfStringField(predicate="nws:street", language="en")
+
+        class Meta:
+            rdf_prefixes = {"nws": NWS}
+            rdf_skolemize = skolemize
+
+    class HashedPersonSerializer(RdfSerializer):
+        name = RdfStringField(predicate="nws:name")
+        address = RdfObjectField(HashedAddressSerializer, predicate="nws:address")
+
+        class Meta:
+            rdf_subject = "id"
+            rdf_prefixes = {"nws": NWS}
+
+    return HashedPersonSerializer
+
+
 def print_graph(g):
     print(g.serialize(format="turtle"))
     pprint(list(g))